@@ -3,7 +3,9 @@ import asyncio
 from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QPushButton, QTextEdit, QWidget
 from PyQt6.QtCore import QThread, pyqtSignal
 from utils.environement import load_env_variables
-import ccxt.pro as ccxtpro
+from utils.market_cache import load_markets
+from utils.exchange_pool import borrow_exchange, close_exchanges
+from utils.rate_limiter import get_rate_limiter
 
 if sys.platform.startswith('win'):
     print('System is Windows')
@@ -80,14 +82,15 @@ async def get_portfolio_and_choose_coin(exchange_name, api_key, secret, min_trad
     Fetch the user's portfolio and determine the best coin for arbitrage.
     """
     try:
-        exchange_class = getattr(ccxtpro, exchange_name)
-        exchange = exchange_class({
+        # Same config as run_arbitrage, so the pool hands back its session
+        exchange = borrow_exchange(exchange_name, {
             'apiKey': api_key,
             'secret': secret,
-            'enableRateLimit': True,
+            'enableRateLimit': False,  # Paced by the shared token bucket
         })
 
-        await exchange.load_markets()
+        await load_markets(exchange)
+        await get_rate_limiter(exchange).acquire('fetch_balance')
         balance = await exchange.fetch_balance()
         portfolio = balance['total']  # Total balance (available + reserved)
 
@@ -106,9 +109,6 @@ async def get_portfolio_and_choose_coin(exchange_name, api_key, secret, min_trad
     except Exception as e:
         return None, 0
 
-    finally:
-        await exchange.close()
-
 
 async def calculate_arbitrage_profit(exchange, market_path, start_coin, start_amount):
     """
@@ -117,6 +117,7 @@ async def calculate_arbitrage_profit(exchange, market_path, start_coin, start_am
     amount = start_amount
     try:
         for market in market_path:
+            await get_rate_limiter(exchange).acquire('fetch_ticker')
             ticker = await exchange.fetch_ticker(market)
             bid_price = ticker['bid']
             ask_price = ticker['ask']
@@ -136,11 +137,10 @@ async def run_arbitrage(exchange_name, api_key, secret, min_trade_volume_thresho
     """
     Main function to run arbitrage.
     """
-    exchange_class = getattr(ccxtpro, exchange_name)
-    exchange = exchange_class({
+    exchange = borrow_exchange(exchange_name, {
         'apiKey': api_key,
         'secret': secret,
-        'enableRateLimit': True,
+        'enableRateLimit': False,  # Paced by the shared token bucket
     })
 
     try:
@@ -167,7 +167,7 @@ async def run_arbitrage(exchange_name, api_key, secret, min_trade_volume_thresho
         log_callback(f"Error during arbitrage: {e}")
 
     finally:
-        await exchange.close()
+        await close_exchanges()  # asyncio.run() ends the loop the sessions are bound to
 
 
 if __name__ == "__main__":
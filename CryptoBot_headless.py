@@ -0,0 +1,209 @@
+import sys
+import json
+import signal
+import asyncio
+import logging
+import argparse
+import contextlib
+from datetime import datetime
+
+import yaml
+
+from utils.exchange_pool import close_exchanges
+from utils.arbitrage_pipeline import run_arbitrage
+
+# Headless scanner: runs the same pipeline as CryptoBot_main.py without any Qt import and
+# writes one JSON object per line ({"type": "log" | "error" | "opportunity" | "removed", ...}).
+# "removed" is sent when a triangle reported as an opportunity stops being profitable.
+#
+#   python CryptoBot_headless.py --config scanner.yaml
+#   python CryptoBot_headless.py --exchange binance --coins BTC,ETH,USDT --min-volume 10
+#   python CryptoBot_headless.py --config scanner.yaml --trade-amounts USDT=500,BTC=0.01
+#   python CryptoBot_headless.py --config scanner.yaml --top-of-book            # Starts a shared feed
+#   python CryptoBot_headless.py --config other.yaml --top-of-book psm_1a2b3c   # Reads that feed
+#
+# Config file keys: exchange, exchange_config (ccxt options, e.g. apiKey/secret),
+# white_listed_coins, min_trade_volume_threshold, trade_amounts ({coin: size traded from
+# that coin}, the balance of the coin otherwise), scan_processes (processes pricing the
+# triangles, 1 prices them in this process), top_of_book (true to stream the books from a
+# shared-memory feed started for the scan, or the block name of a feed started by another
+# scanner, which then opens no websocket of its own), log_file. Arguments override the file.
+
+DEFAULT_CONFIG = {
+    'exchange': None,
+    'exchange_config': {},
+    'white_listed_coins': [],
+    'min_trade_volume_threshold': 1,
+    'trade_amounts': {},
+    'scan_processes': 1,
+    'top_of_book': None,
+    'log_file': "debug.log",
+}
+
+
+def load_config(args):
+    """Merge the YAML config file (if any) with the command line arguments."""
+    config = dict(DEFAULT_CONFIG)
+    if args.config:
+        with open(args.config) as file:
+            config.update(yaml.safe_load(file) or {})
+    if args.exchange:
+        config['exchange'] = args.exchange
+    if args.coins:
+        config['white_listed_coins'] = [coin.strip().upper() for coin in args.coins.split(',') if coin.strip()]
+    if args.min_volume is not None:
+        config['min_trade_volume_threshold'] = args.min_volume
+    if args.trade_amounts:
+        config['trade_amounts'] = parse_trade_amounts(args.trade_amounts)
+    if args.processes is not None:
+        config['scan_processes'] = args.processes
+    if args.top_of_book is not None:
+        config['top_of_book'] = args.top_of_book
+    if args.api_key:
+        config['exchange_config'] = {**config['exchange_config'], 'apiKey': args.api_key, 'secret': args.secret}
+    if args.log_file:
+        config['log_file'] = args.log_file
+
+    if not config['exchange']:
+        raise ValueError("An exchange is required (--exchange or 'exchange' in the config file)")
+    if not config['white_listed_coins']:
+        raise ValueError("A list of coins is required (--coins or 'white_listed_coins' in the config file)")
+    config['exchange'] = config['exchange'].lower()
+    config['trade_amounts'] = {coin.upper(): float(amount) for coin, amount in (config['trade_amounts'] or {}).items()}
+    # REST calls are paced by the shared token bucket, ccxt's throttler would pace them twice
+    config['exchange_config'] = {'enableRateLimit': False, **(config['exchange_config'] or {})}
+    return config
+
+
+def parse_trade_amounts(text):
+    """Parse "USDT=500,BTC=0.01" into {coin: amount}."""
+    trade_amounts = {}
+    for item in filter(None, (item.strip() for item in text.split(','))):
+        coin, _, amount = item.partition('=')
+        try:
+            trade_amounts[coin.strip()] = float(amount)
+        except ValueError:
+            raise ValueError(f"Invalid trade amount '{item}', expected COIN=AMOUNT")
+    return trade_amounts
+
+
+def _json_default(value):
+    # NumPy scalars from the evaluator serialize as plain numbers
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class JsonLinesWriter:
+    """Write pipeline events as JSON lines, flushed one by one so consumers can tail them."""
+
+    def __init__(self, stream, exchange_id):
+        self.stream = stream
+        self.exchange_id = exchange_id
+
+    def write(self, record_type, **fields):
+        record = {'type': record_type, 'exchange': self.exchange_id, 'time': datetime.now().isoformat(), **fields}
+        self.stream.write(json.dumps(record, default=_json_default) + "\n")
+        self.stream.flush()
+
+    def log(self, message):
+        self.write('log', message=message)
+
+    def error(self, message):
+        self.write('error', message=message)
+
+    def opportunity(self, trade, updated_at):
+        self.write(
+            'opportunity',
+            triangle=trade['triangle'],
+            path=trade['path'],
+            profit=float(trade['profit']),
+            details=trade['details'],
+            updated_at=updated_at.isoformat()
+        )
+
+    def removed(self, trade, updated_at):
+        self.write('removed', triangle=trade['triangle'], path=trade['path'], updated_at=updated_at.isoformat())
+
+
+async def run_headless(config, writer):
+    """Run the scan until SIGINT/SIGTERM, then cancel every task and close the sessions."""
+    running = True
+    running_tasks = set()
+    main_task = asyncio.current_task()
+
+    def stop():
+        nonlocal running
+        if running:
+            running = False
+            writer.log("Stopping scan ...")
+            for task in list(running_tasks):
+                task.cancel()
+            main_task.cancel()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop)
+        except (NotImplementedError, RuntimeError):
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop))  # Windows
+
+    try:
+        await run_arbitrage(
+            running=lambda: running,
+            exchange_id=config['exchange'],
+            exchange_config=config['exchange_config'],
+            result_signal=writer.log,
+            error_signal=writer.error,
+            min_trade_volume_threshold=config['min_trade_volume_threshold'],
+            running_tasks=running_tasks,
+            black_listed_coins=config['white_listed_coins'],
+            trade_signal=writer.opportunity,
+            removed_signal=writer.removed,
+            trade_amounts=config['trade_amounts'],
+            scan_processes=config['scan_processes'],
+            top_of_book=config['top_of_book']
+        )
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await close_exchanges()
+        writer.log("Scan stopped")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless triangular arbitrage scanner (JSON lines output)")
+    parser.add_argument('--config', help="YAML config file")
+    parser.add_argument('--exchange', help="ccxt exchange id, e.g. binance")
+    parser.add_argument('--coins', help="Comma separated coins to scan, e.g. BTC,ETH,USDT")
+    parser.add_argument('--min-volume', type=float, help="Minimum trade volume threshold")
+    parser.add_argument('--trade-amounts', help="Size traded from each starting coin, e.g. USDT=500,BTC=0.01")
+    parser.add_argument('--processes', type=int, help="Processes pricing the triangles (sharded scan when above 1)")
+    parser.add_argument(
+        '--top-of-book', nargs='?', const=True, metavar='BLOCK',
+        help="Stream the books from a shared-memory top of book: starts a feed, or attaches to the named block"
+    )
+    parser.add_argument('--api-key', help="Exchange API key")
+    parser.add_argument('--secret', help="Exchange API secret")
+    parser.add_argument('--output', help="Write the JSON lines to this file instead of stdout")
+    parser.add_argument('--log-file', help="Debug log file")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(args)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        parser.error(str(e))
+
+    logging.basicConfig(filename=config['log_file'], level=logging.INFO, format="%(asctime)s - %(message)s")
+
+    if sys.platform.startswith('win'):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    with contextlib.ExitStack() as stack:
+        stream = stack.enter_context(open(args.output, 'a')) if args.output else sys.stdout
+        # The pipeline's progress prints go to stderr, keeping stdout pure JSON lines
+        stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        writer = JsonLinesWriter(stream, config['exchange'])
+        asyncio.run(run_headless(config, writer))
+
+
+if __name__ == "__main__":
+    main()
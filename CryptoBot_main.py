@@ -2,7 +2,6 @@ import sys
 import asyncio
 import sqlite3
 import logging
-import time
 from datetime import datetime
 
 # Use uvloop if available
@@ -17,16 +16,22 @@ else:
     # Use the default event loop policy for macOS/Linux
     pass
 
-from PyQt6.QtCore import pyqtSignal, QSize, QThread
-from PyQt6.QtGui import QIcon, QTextCursor
+from PyQt6.QtCore import pyqtSignal, QSize, QObject, Qt
+from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QDialog, QMessageBox, QTableWidgetItem, QHBoxLayout, \
     QPushButton
 
-import ccxt.pro as ccxtpro
+from qasync import QEventLoop, asyncSlot
 from ui.main_window import Ui_MainWindow
+from components.ConsoleLogSink import ConsoleLogSink
+from components.OpportunityTableModel import OpportunityTableModel
+from components.LatestValueBridge import LatestValueBridge
 from ui.manage_api import Ui_api_keys_list
 from ui.new_exchange import Ui_new_echange_window
-from utils.utils import connect_or_create_db, list_available_coins, available_trading_pairs, tradable_pairs
+from utils.utils import list_available_coins, available_trading_pairs
+from utils.database import get_database
+from utils.exchange_pool import close_exchanges
+from utils.arbitrage_pipeline import fetch_spot_markets, run_arbitrage
 
 # Database Path
 DB_PATH = "data/crypto_boy.sqlite"
@@ -44,8 +49,18 @@ class MainWindow(QMainWindow):
         self.new_exchange_dialog = None
         self.manage_api_window = None
         self.worker = None
+        self.coin_list_task = None  # Pending lookup of the selected exchange's coins
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
+        self.console_sink = ConsoleLogSink(self.ui.console)
+        # One row per triangle, updated in place as its books move
+        self.opportunity_model = OpportunityTableModel([
+            ("Triangle", "triangle"), ("Path", "path"), ("Profit", "profit", "{:.8f}"),
+            ("Slippage", "slippage", "{:.4%}"), ("Max size", "max_profitable_size", "{:.8f}"),
+            ("Updated at", "updated_at")
+        ], key_fields=("triangle", "path"), max_rows=500)  # Both directions of a triangle are separate rows
+        self.ui.opportunity_board.setModel(self.opportunity_model)
+        self.ui.opportunity_board.sortByColumn(2, Qt.SortOrder.DescendingOrder)  # Best profit first
         self.populate_list_exchanges()
         # self.populate_list_coins()
         self.ui.stop_scan.setDisabled(True)
@@ -69,10 +84,15 @@ class MainWindow(QMainWindow):
         """Populate the list of coins based on the selected exchange."""
         self.ui.black_list_symbols.clear()  # Clear the current list
 
-        # Create and start the async worker
-        self.async_worker = AsyncWorker(exchange_id)
-        self.async_worker.finished.connect(self.update_coin_list)
-        self.async_worker.start()
+        # Only the latest selection matters, drop a lookup still in flight
+        if self.coin_list_task is not None:
+            self.coin_list_task.cancel()
+        self.coin_list_task = asyncio.ensure_future(self.load_coin_list(exchange_id))
+
+    async def load_coin_list(self, exchange_id):
+        """Fetch the spot pairs of an exchange on the shared loop and list its coins."""
+        spot_pairs = await fetch_spot_markets(exchange_id)
+        self.update_coin_list(spot_pairs)
 
     def update_coin_list(self, spot_pairs):
         """Update the UI with the retrieved spot market pairs."""
@@ -103,19 +123,12 @@ class MainWindow(QMainWindow):
                 self.ui.exchange_list.addItem(exchange_name, exchange_id)
 
     def get_list_active_exchanges(self):
-        connection = init_db()
-        cursor = connection.cursor()
-
-        # Query data
+        # Query data (cached until the next write)
         query = "SELECT exchange_id, exchange_name FROM exchanges WHERE exchange_id IN (SELECT exchange_ext_id FROM exchanges_api_config)"
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        return get_database().fetchall(query, cached=True)
 
-        # Close connection
-        connection.close()
-        return rows
-
-    def stop_process_scan(self):
+    @asyncSlot()
+    async def stop_process_scan(self):
         self.enable_controls()
         self.print_to_console("********************************************", "red")
         self.print_to_console("CryptoBot", "red")
@@ -123,20 +136,27 @@ class MainWindow(QMainWindow):
         self.print_to_console("Stopping Scan ... please wait !", "red")
         self.print_to_console("********************************************", "red")
         if self.worker is not None:
-            self.worker.stop()
-            self.worker.wait()  # Wait for the thread to finish
+            await self.worker.stop()  # Returns once every task of the scan is cancelled
+            self.worker = None
             self.print_to_console("Scan Stopped!", "red")
 
+    async def shutdown(self):
+        """Cancel the pending work and close the exchange sessions before the loop closes."""
+        if self.coin_list_task is not None:
+            self.coin_list_task.cancel()
+        if self.worker is not None:
+            await self.worker.stop()
+        await close_exchanges()
+        get_database().close()
+
     def get_exchange_config(self, exchange_id):
-        connection = init_db()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM exchanges_api_config WHERE exchange_ext_id = ?", (exchange_id,))
-        config = cursor.fetchone()
-        api_config = {}
+        config = get_database().fetchone(
+            "SELECT * FROM exchanges_api_config WHERE exchange_ext_id = ?", (exchange_id,), cached=True
+        )
+        api_config = {'enableRateLimit': False}  # Paced by the shared token bucket (utils.rate_limiter)
         if config:
             api_config['apiKey'] = config[1]
             api_config['secret'] = config[2]
-            api_config['enableRateLimit'] = True
             api_config['uid'] = config[3] or None
             api_config['login'] = config[6] or None
             api_config['password'] = config[7] or None
@@ -151,7 +171,8 @@ class MainWindow(QMainWindow):
         self.disable_controls()
         self.save_black_list_config()
         black_list_symbols = self.ui.black_list_symbols.currentData()
-        self.ui.console.clear()
+        self.console_sink.clear()
+        self.opportunity_model.clear()
         # Start the scan
         self.print_to_console("********************************************", "green")
         self.print_to_console("CryptoBot V1", "green")
@@ -184,15 +205,22 @@ class MainWindow(QMainWindow):
             min_trade_volume_threshold=self.ui.min_transaction_amount.value()
         )
         self.worker.result_signal.connect(self.print_to_console)
+        self.worker.error_signal.connect(self.print_error_to_console)
+        self.worker.opportunity_bridge.updated.connect(self.opportunity_model.upsert_many)
+        self.worker.opportunity_bridge.removed.connect(self.remove_opportunities)
         self.worker.start()
 
+    def remove_opportunities(self, keys):
+        """Drop the board rows of the cycles that are no longer profitable."""
+        for key in keys:
+            self.opportunity_model.remove(key)
+
     def print_to_console(self, text, color="white"):
-        console_output_template = f"<span style='color: {color}'>{text}</span>"
-        self.ui.console.append(console_output_template)
+        # Queued and written to the console in batches (see ConsoleLogSink)
+        self.console_sink.write(text, color)
 
-        cursor = self.ui.console.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        self.ui.console.setTextCursor(cursor)
+    def print_error_to_console(self, text):
+        self.print_to_console(text, "red")
 
     def reset_selection(self):
         self.ui.black_list_symbols.clear()
@@ -212,8 +240,6 @@ class MainWindow(QMainWindow):
         self.ui.stop_scan.setDisabled(True)
 
     def save_black_list_config(self):
-        connection = init_db()
-        cursor = connection.cursor()
         blacklisted_symbols = self.load_black_list_symbols()
         currently_selected_coins = self.build_blacklist()
         if blacklisted_symbols is not None:
@@ -221,21 +247,18 @@ class MainWindow(QMainWindow):
             query = """
                 UPDATE black_list_symbols set symbol_code = ? WHERE symbol_id = ?
             """
-            cursor.execute(query, (currently_selected_coins, symbol_id))
+            get_database().execute(query, (currently_selected_coins, symbol_id))
         else:
             query = """
                         INSERT INTO black_list_symbols (symbol_code)
                         VALUES (?)
                     """
-            cursor.execute(query, (currently_selected_coins,))
-        connection.commit()
+            get_database().execute(query, (currently_selected_coins,))
 
     def load_black_list_symbols(self):
-        connection = init_db()
-        cursor = connection.cursor()
-        cursor.execute("SELECT symbol_id, symbol_code FROM black_list_symbols ORDER BY symbol_id DESC LIMIT 1")
-        config = cursor.fetchone()
-        return config
+        return get_database().fetchone(
+            "SELECT symbol_id, symbol_code FROM black_list_symbols ORDER BY symbol_id DESC LIMIT 1", cached=True
+        )
 
     def pre_set_black_list_symbols(self):
         symbols = self.load_black_list_symbols()
@@ -272,8 +295,6 @@ class ManageAPIWindow(QWidget):
     def populate_list_exchanges_config(self):
         """Populate the API Keys Table"""
         self.ui.list_apis_table.setRowCount(0)  # Clear the table first
-        connection = init_db()
-        cursor = connection.cursor()
         query = """SELECT
                 config.exchange_config_id,
                 ex.exchange_name,
@@ -284,8 +305,7 @@ class ManageAPIWindow(QWidget):
                 ex.exchange_keygen_url
                 FROM exchanges_api_config config
                 LEFT JOIN exchanges ex ON config.exchange_ext_id = ex.exchange_id;"""
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        rows = get_database().fetchall(query, cached=True)
 
         # Set up the table
         self.ui.list_apis_table.setRowCount(len(rows))
@@ -347,16 +367,11 @@ class ManageAPIWindow(QWidget):
             action_widget.setLayout(action_layout)
             self.ui.list_apis_table.setCellWidget(row_idx, 5, action_widget)
 
-        connection.close()
-
     def reload_table(self):
         """Reload the API Keys Table"""
         self.populate_list_exchanges_config()
 
     def delete_entry(self, row_id):
-        connection = init_db()
-        cursor = connection.cursor()
-
         # Confirm deletion
         reply = QMessageBox.question(
             self, 'Confirm Deletion',
@@ -366,13 +381,10 @@ class ManageAPIWindow(QWidget):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            cursor.execute("DELETE FROM exchanges_api_config WHERE exchange_config_id = ?", (row_id,))
-            connection.commit()
+            get_database().execute("DELETE FROM exchanges_api_config WHERE exchange_config_id = ?", (row_id,))
             self.reload_table()  # Refresh the table
             QMessageBox.information(self, "Deleted", f"Entry with ID: {row_id} has been deleted.")
 
-        connection.close()
-
     def edit_entry(self, row_id):
         """Open the edit dialog for the selected entry"""
         self.new_exchange_dialog = NewExchangeDialog(row_id=row_id)
@@ -408,15 +420,12 @@ class NewExchangeDialog(QDialog):
     def load_data(self):
         """Load existing data for editing"""
         try:
-            connection = init_db()
-            cursor = connection.cursor()
             query = """
                 SELECT api_key, api_secret, uid, passphrase, login, password, twofa, privateKey, walletAddress, token, exchange_ext_id
                 FROM exchanges_api_config
                 WHERE exchange_config_id = ?
                 """
-            cursor.execute(query, (self.row_id,))
-            row = cursor.fetchone()
+            row = get_database().fetchone(query, (self.row_id,))
 
             if row:
                 api_key, api_secret, uid, passphrase, login, password, twofa, private_key, wallet_address, token, exchange_ext_id = row
@@ -434,21 +443,15 @@ class NewExchangeDialog(QDialog):
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load data: {str(e)}")
-        finally:
-            connection.close()
 
     def populate_list_exchanges(self, selected_exchange_id=None):
         """Populate the dropdown with exchanges and optionally select one"""
-        connection = init_db()
-        cursor = connection.cursor()
-
         # Query data
         if selected_exchange_id is None:
             query = "SELECT exchange_id, exchange_name FROM exchanges WHERE exchange_id NOT IN(SELECT exchange_ext_id FROM exchanges_api_config)"
         else:
             query = "SELECT exchange_id, exchange_name FROM exchanges"
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        rows = get_database().fetchall(query, cached=True)
 
         for row in rows:
             exchange_id, exchange_name = row
@@ -457,8 +460,6 @@ class NewExchangeDialog(QDialog):
             if selected_exchange_id and exchange_id == selected_exchange_id:
                 self.ui.list_exchanges.setCurrentIndex(self.ui.list_exchanges.count() - 1)
 
-        connection.close()
-
     def save_to_db(self):
         """Save the edited or new exchange data to the database"""
         exchange_id = self.ui.list_exchanges.currentData()
@@ -478,9 +479,7 @@ class NewExchangeDialog(QDialog):
             return
 
         try:
-            connection = init_db()
-            cursor = connection.cursor()
-
+            database = get_database()
             if self.row_id:
                 # Update existing entry
                 query = """
@@ -498,7 +497,7 @@ class NewExchangeDialog(QDialog):
                     exchange_ext_id = ?
                     WHERE exchange_config_id = ?
                 """
-                cursor.execute(query, (
+                database.execute(query, (
                     api_key,
                     api_secret,
                     uid,
@@ -529,7 +528,7 @@ class NewExchangeDialog(QDialog):
                     exchange_ext_id = ?)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """
-                cursor.execute(query, (
+                database.execute(query, (
                     api_key,
                     api_secret,
                     uid,
@@ -543,7 +542,6 @@ class NewExchangeDialog(QDialog):
                     exchange_id
                 ))
 
-            connection.commit()
             self.data_saved.emit()  # type: ignore  # Emit signal
             QMessageBox.information(self, "Success", "Exchange data saved successfully.")
 
@@ -551,13 +549,11 @@ class NewExchangeDialog(QDialog):
             QMessageBox.critical(self, "Database Error", "Duplicate entry detected.")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}")
-        finally:
-            connection.close()
 
 
-class ArbitrageWorker(QThread):
+class ArbitrageWorker(QObject):
     """
-    Worker thread to run the triangular arbitrage calculation.
+    Runs the triangular arbitrage scan as a task of the application's asyncio loop.
     """
     result_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
@@ -572,7 +568,8 @@ class ArbitrageWorker(QThread):
         self.min_trade_volume_threshold = min_trade_volume_threshold  # Default threshold
         self.task = None  # Main task
         self.running_tasks = set()  # Track all running tasks
-        self.loop = asyncio.new_event_loop() # Use QEventLoop for asynchronous tasks
+        # Opportunity state reaches the GUI latest-value-wins, at most once per frame
+        self.opportunity_bridge = LatestValueBridge()
 
     async def run_arbitrage(self):
         """Run the arbitrage function asynchronously."""
@@ -585,341 +582,54 @@ class ArbitrageWorker(QThread):
                 error_signal=self.error_signal.emit,
                 min_trade_volume_threshold=self.min_trade_volume_threshold,
                 running_tasks=self.running_tasks,  # Pass the running tasks set
-                black_listed_coins=self.black_listed_coins
+                black_listed_coins=self.black_listed_coins,
+                trade_signal=self.emit_opportunity,
+                removed_signal=self.emit_removal
             )
         except asyncio.CancelledError:
             self.result_signal.emit("Arbitrage task was canceled.")
         except Exception as e:
             self.error_signal.emit(f"Error in arbitrage: {str(e)}")
 
-    def run(self):
-        """Run the event loop for the asynchronous function."""
-        asyncio.set_event_loop(self.loop)  # Set the event loop for this thread
-        self.task = self.loop.run_until_complete(self.run_arbitrage())
-
-    def stop(self):
-        """Stop all running tasks and clean up."""
+    @staticmethod
+    def opportunity_key(trade):
+        """Board row key of a trade: (combined symbols, path)."""
+        return trade["triangle"]["combined"], " -> ".join(trade["path"])
+
+    def emit_removal(self, trade, updated_at):
+        """Remove a cycle that stopped being profitable from the opportunity board."""
+        self.opportunity_bridge.remove(self.opportunity_key(trade))
+
+    def emit_opportunity(self, trade, updated_at):
+        """Publish a profitable trade to the opportunity board as a flat record."""
+        triangle, path = self.opportunity_key(trade)
+        # One bridge slot per directed cycle, the same key as the board row
+        self.opportunity_bridge.publish((triangle, path), {
+            "triangle": triangle,
+            "path": path,
+            "profit": float(trade["profit"]),
+            "slippage": trade["details"]["slippage"],
+            "max_profitable_size": trade["details"]["max_profitable_size"],
+            "updated_at": f"{updated_at:%H:%M:%S.%f}",
+        })
+
+    def start(self):
+        """Schedule the scan on the running loop (the exchange sessions are shared with the rest of the app)."""
+        self.task = asyncio.ensure_future(self.run_arbitrage())
+
+    async def stop(self):
+        """Cancel the scan and every task it started, and wait until they are done."""
         print("Stopping scan...")
         self.running = False
-        for task in self.running_tasks:
+        tasks = list(self.running_tasks)
+        if self.task is not None:
+            tasks.append(self.task)
+        for task in tasks:
             task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         self.running_tasks.clear()
-        self.loop.stop()  # Stop the event loop
 
 
-# Worker class for running async tasks
-# Class OK
-class AsyncWorker(QThread):
-    finished = pyqtSignal(list)  # Signal to emit the result
-
-    def __init__(self, exchange_id):
-        super().__init__()
-        self.exchange_id = exchange_id
-
-    def run(self):
-        # Run the async function in the event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(fetch_spot_markets(self.exchange_id))
-        self.finished.emit(result)  # Emit the result when done
-
-# Function OK
-async def fetch_spot_markets(exchange_id):
-    # Initialize the exchange
-    exchange = getattr(ccxtpro, exchange_id)({
-        'enableRateLimit': True,  # Enable rate limiting to avoid being banned
-    })
-
-    try:
-        # Fetch all markets
-        markets = await exchange.fetch_markets()
-
-        # Filter for spot markets
-        spot_markets = [market for market in markets if market['spot']]
-
-        # Extract trading pairs
-        spot_pairs = [market['symbol'] for market in spot_markets]
-
-        return spot_pairs
-
-    except Exception as e:
-        print(f"An error occurred: {e}")
-    finally:
-        # Close the exchange connection
-        await exchange.close()
-
-async def run_arbitrage(running, exchange_id, exchange_config, result_signal, error_signal, min_trade_volume_threshold, running_tasks, black_listed_coins):
-    """Run the arbitrage detection and emit results."""
-    print("run_arbitrage")
-    exchange = get_exchange(exchange_id, exchange_config, result_signal)
-    try:
-        profitable_trades = []
-        await initialize_exchange(exchange, result_signal)
-        result_signal("Market Data fetched !")
-        result_signal("Building and analizing triangular opportunities")
-        task = asyncio.create_task(get_triangulation_opportunities(exchange, min_trade_volume_threshold, result_signal, running_tasks, black_listed_coins))
-        running_tasks.add(task)
-        task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
-        try:
-            profitable_trades = await task
-        except ValueError as e:
-            result_signal(f'{e}')
-        while running:
-            for trade in profitable_trades:
-                profit_info = (
-                    f"Profitable Triangle: {trade['triangle']}\n"
-                    f"Profit: {trade['profit']:.6f} units\n"
-                    f"Details: {trade['details']}\n"
-                )
-                result_signal(profit_info)
-
-            await asyncio.sleep(1)
-    except asyncio.CancelledError:
-        result_signal("Arbitrage task was stopped.")
-    except Exception as e:
-        print(f"arbitrage detection error : {e}")
-        logging.info(f"arbitrage detection error : {e}")
-        error_signal(f"arbitrage detection error : {str(e)}")
-    finally:
-        if exchange:
-            await exchange.close()
-
-# Function Call OK
-async def get_triangulation_opportunities(exchange, min_trade_volume_threshold, result_signal, running_tasks, white_listed_coins):
-    print("get_triangulation_opportunities")
-    available_pairs = list(exchange.markets.keys())
-    task = asyncio.create_task(get_portfolio_and_choose_coin(
-        exchange, min_trade_volume_threshold, running_tasks
-    ))
-    running_tasks.add(task)
-    task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
-
-    best_coin, best_coin_balance, eligible_coins = await task
-    if best_coin and best_coin_balance and eligible_coins :
-        result_signal(f"Best suited coin in your ballance is {best_coin} with a balance of {best_coin_balance}")
-        result_signal(f"Other eligible coins are {', '.join(eligible_coins)}")
-    else:
-        result_signal(f"Your portfolio does not seems to have any balance, check your API KEY/ API Secret for potential error !")
-    try:
-        triangular_pairs = tradable_pairs(available_pairs, eligible_coins, white_listed_coins)
-        result_signal('list of triangular paris are :')
-        result_signal(triangular_pairs)
-    except ValueError as err:
-        result_signal(f"The exchange you selected does not contain any coin : {err}")
-        raise ValueError('Arbitrage aborted not enough coins on the exchange to perform actions')
-    return await calculate_arbitrage_profit(exchange, triangular_pairs, min_trade_volume_threshold, result_signal, running_tasks)
-
-# function OK
-async def get_portfolio_and_choose_coin(exchange, min_trade_volume_threshold, running_tasks):
-    """
-    Fetch the user's portfolio and determine eligible coins for trading.
-    """
-    print("get_portfolio_and_choose_coin")
-    try:
-        # await exchange.load_markets()
-        task = asyncio.create_task(exchange.fetch_balance())
-        running_tasks.add(task)
-        task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
-        
-        balance = await task
-        portfolio = balance['total']  # Total balance (available + reserved)
-
-        # Filter coins eligible for arbitrage
-        eligible_coins = {coin: amount for coin, amount in portfolio.items() if amount >= min_trade_volume_threshold}
-
-        if not eligible_coins:
-            return None, 0, []
-
-        # Choose the best coin for arbitrage (e.g., highest balance)
-        best_coin = max(eligible_coins, key=eligible_coins.get)
-        best_coin_balance = eligible_coins[best_coin]
-
-        # Get the list of eligible coins
-        eligible_coin_list = list(eligible_coins.keys())
-
-        #to-do : for testing purpose
-        return 'SOL', 100, ['SOL', 'USDT', 'BTC', 'ETH']
-        
-        return best_coin, best_coin_balance, eligible_coin_list
-
-    except Exception as e:
-        print(f"Error fetching portfolio: {e}")
-        logging.info(f"Error fetching portfolio: {e}")
-        return None, 0, []
-
-    finally:
-        await exchange.close()
-
-# Global Variables
-semaphore = asyncio.Semaphore(10)  # Limit concurrent requests to 10
-cache = {}  # Cache for storing order books
-cache_ttl = 60  # Time-to-live for cached order books in seconds
-
-
-async def fetch_order_book(
-    exchange,
-    pair,
-    result_signal,
-    running_tasks,
-    retries=3,
-    backoff=1,
-    throttle_delay=0.1,
-):
-    """
-    Fetch the order book for a given pair with concurrency limiting, throttling, caching, and retries.
-    Args:
-        exchange: The exchange instance.
-        pair: The trading pair (e.g., 'BTC/USDT').
-        retries: Number of retries on failure.
-        backoff: Base delay for exponential backoff (in seconds).
-        throttle_delay: Delay between requests to prevent throttling (in seconds).
-    Returns:
-        The order book for the given pair or None on failure.
-    """
-    print(f"Fetching order book for pair: {pair}")
-    result_signal(f"Fetching order book for pair: {pair}")
-    # Check if the pair is in the cache and still valid
-    current_time = time.time()
-    if pair in cache:
-        cached_time, cached_order_book = cache[pair]
-        if current_time - cached_time < cache_ttl:  # Cache is still valid
-            logging.info(f"Using cached order book for pair: {pair}")
-            return pair, cached_order_book  # Return as a tuple
-
-    # Throttling: Introduce a small delay before making the request
-    await asyncio.sleep(throttle_delay)
-
-    # Fetch the order book with concurrency limiting and retries
-    async with semaphore:
-        for attempt in range(1, retries + 1):
-            try:
-                logging.info(f"Fetching order book for pair: {pair} (Attempt {attempt})")
-                result_signal(f"Fetching order book for pair: {pair} (Attempt {attempt})")
-                
-                task = asyncio.create_task(exchange.fetch_order_book(pair))
-                running_tasks.add(task)
-                task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
-                
-                order_book = await task
-
-                # Cache the result
-                cache[pair] = (time.time(), order_book)
-
-                return pair, order_book  # Return as a tuple
-            except Exception as e:
-                logging.error(
-                    f"Error fetching order book for {pair} on attempt {attempt}: {e}"
-                )
-                if attempt < retries:
-                    await asyncio.sleep(backoff * (2 ** (attempt - 1)))  # Exponential backoff
-                else:
-                    logging.error(f"Failed to fetch order book for pair: {pair} after {retries} retries.")
-                    return pair, None  # Return pair with None
-
-async def calculate_arbitrage_profit(exchange, triangular_pairs, min_trade_volume_threshold, result_signal, running_tasks):
-    result_signal("calculating arbitrage profit starting...")
-    fees = exchange.fees.get('trading', {}).get('taker', 0.001)  # Default fee
-    print("fees")
-    print(fees)
-    all_pairs = set(triangle[pair] for triangle in triangular_pairs for pair in ['pair_a', 'pair_b', 'pair_c'])
-    tasks = [fetch_order_book(exchange, pair, result_signal, running_tasks) for pair in all_pairs]
-    # Collect results
-    order_books = await asyncio.gather(*tasks)
-    # Build the dictionary safely
-    order_book_dict = {pair: book for pair, book in order_books if book is not None}
-    # print('Order book : ')
-    # print(order_book_dict)
-    profitable_trades = []
-
-    for triangle in triangular_pairs:
-        # print('triangle arbitrage')
-        # print(triangle)
-        pair_a, pair_b, pair_c = triangle["pair_a"], triangle["pair_b"], triangle["pair_c"]
-        order_book_a, order_book_b, order_book_c = order_book_dict.get(pair_a), order_book_dict.get(
-            pair_b), order_book_dict.get(pair_c)
-        if not order_book_a or not order_book_b or not order_book_c:
-            continue
-
-        min_volume_a = get_dynamic_min_volume(order_book_a, min_trade_volume_threshold)
-        min_volume_b = get_dynamic_min_volume(order_book_b, min_trade_volume_threshold)
-        min_volume_c = get_dynamic_min_volume(order_book_c, min_trade_volume_threshold)
-
-        # Check against the minimum trade volume threshold
-        if min_volume_a < min_trade_volume_threshold or \
-                min_volume_b < min_trade_volume_threshold or \
-                min_volume_c < min_trade_volume_threshold:
-            print('Check against the minimum trade volume threshold : Failed')
-            continue
-
-        a_ask = order_book_a['asks'][0][0] if order_book_a['asks'] else None
-        b_bid = order_book_b['bids'][0][0] if order_book_b['bids'] else None
-        c_bid = order_book_c['bids'][0][0] if order_book_c['bids'] else None
-
-        if not (a_ask and b_bid and c_bid):
-            continue
-
-        start_amount = 1.0
-        amount_b = (start_amount / a_ask) * (1 - fees)
-        amount_c = (amount_b * b_bid) * (1 - fees)
-        end_amount = (amount_c * c_bid) * (1 - fees)
-        profit = end_amount - start_amount
-
-        if profit > 0:
-            profitable_trades.append({
-                "triangle": triangle,
-                "profit": profit,
-                "details": {
-                    "start_amount": start_amount,
-                    "end_amount": end_amount,
-                    "a_ask": a_ask,
-                    "b_bid": b_bid,
-                    "c_bid": c_bid,
-                    "min_volume_a": min_volume_a,
-                    "min_volume_b": min_volume_b,
-                    "min_volume_c": min_volume_c
-                }
-            })
-
-    return profitable_trades
-
-def get_dynamic_min_volume(order_book, min_trade_volume_threshold=0):
-    """
-    Dynamically determine the minimum tradable volume based on the order book.
-    Args:
-        order_book (dict): Order book data.
-        min_trade_volume_threshold (float): Minimum volume required for a trade.
-    Returns:
-        float: Minimum tradable volume or 0 if insufficient liquidity.
-    """
-    print("get_dynamic_min_volume")
-    if not order_book.get('bids') or not order_book.get('asks'):
-        return 0  # No valid data in the order book
-
-    best_ask_volume = order_book['asks'][0][1] if order_book['asks'] else float('inf')
-    best_bid_volume = order_book['bids'][0][1] if order_book['bids'] else float('inf')
-
-    # Minimum volume from both sides
-    min_volume = min(best_ask_volume, best_bid_volume)
-
-    # Ensure volume meets the threshold
-    return min_volume if min_volume >= min_trade_volume_threshold else 0
-
-async def initialize_exchange(exchange, result_signal):
-    """Initialize the exchange."""
-    print("initialize_exchange")
-    result_signal("Initializing Exchange and fetching Market Data.......")
-    await exchange.load_markets()
-    
-def get_exchange(exchange_id, exchange_config, result_signal):
-    print("get_exchange")
-    
-    result_signal(f"Loading Exchange : {exchange_id}")
-    exchange = getattr(ccxtpro, exchange_id)(exchange_config)
-    return exchange
-
-# Initialize SQLite Database
-def init_db():
-    return connect_or_create_db()
 
 
 
@@ -1055,8 +765,18 @@ def init_db():
 
 # Main Function
 if __name__ == "__main__":
-    init_db()  # Ensure the database is set up
+    get_database().connection  # Open (and create on first run) the shared database
     app = QApplication(sys.argv)
+
+    # One qasync loop hosts the GUI, every scan and the shared exchange sessions
+    loop = QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    app_close_event = asyncio.Event()
+    app.aboutToQuit.connect(app_close_event.set)
+
     main_window = MainWindow()
     main_window.show()
-    sys.exit(app.exec())
+
+    with loop:
+        loop.run_until_complete(app_close_event.wait())
+        loop.run_until_complete(main_window.shutdown())
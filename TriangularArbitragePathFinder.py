@@ -1,9 +1,18 @@
 import asyncio
 import ccxt.pro as ccxtpro
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Tuple, Set, Optional
 from dotenv import load_dotenv
 import os
 
+import numpy as np
+
+from utils.market_cache import load_markets
+from utils.order_book_manager import OrderBookManager
+from utils.book_snapshots import fetch_order_book_snapshots
+from utils.cycle_engine import CycleEngine
+from utils.market_graph import MarketGraph
+from utils.rate_limiter import get_rate_limiter
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -36,7 +45,7 @@ class TriangularArbitragePathFinder:
         
         # Configure API credentials
         config = {
-            'enableRateLimit': True,
+            'enableRateLimit': False,  # Paced by the shared token bucket (utils.rate_limiter)
             'options': {
                 'defaultType': 'spot',  # Focus on spot markets
             }
@@ -60,12 +69,15 @@ class TriangularArbitragePathFinder:
         self.markets = None
         self.symbols = None
         self.graph = None
+        self.cycle_engine = None  # Built on the first cycle search, then kept current by the live books
+        # One live subscription per symbol, every update re-weights the cycle engine
+        self.order_books = OrderBookManager(self.exchange, on_update=self._on_book_update)
     
     async def initialize(self):
         """Load markets and build the exchange graph"""
         try:
             print(f"Connecting to {self.exchange_id}...")
-            await self.exchange.load_markets()
+            await load_markets(self.exchange)
             self.markets = self.exchange.markets
             self.symbols = self.exchange.symbols
             print(f"Successfully connected to {self.exchange_id}")
@@ -75,8 +87,8 @@ class TriangularArbitragePathFinder:
             raise
     
     def _build_exchange_graph(self):
-        """Build a graph representation of the exchange markets"""
-        self.graph = {}
+        """Build a graph representation of the exchange markets (CSR arrays over interned coin ids)"""
+        markets = []
         
         for symbol in self.symbols:
             try:
@@ -86,18 +98,34 @@ class TriangularArbitragePathFinder:
                 if not self.markets[symbol].get('active', True):
                     continue
                 
-                # Add edge from base to quote
-                if base not in self.graph:
-                    self.graph[base] = set()
-                self.graph[base].add(quote)
-                
-                # Add edge from quote to base (for inverse trading pair)
-                if quote not in self.graph:
-                    self.graph[quote] = set()
-                self.graph[quote].add(base)
+                # One market gives an edge in both directions (base → quote and quote → base)
+                markets.append((symbol, base, quote))
             except:
                 # Skip symbols that don't split into two parts
                 continue
+        
+        self.graph = MarketGraph(markets)
+    
+    def _path_legs(self, path: List[str]) -> Optional[List[Tuple[str, bool]]]:
+        """
+        Markets traded along a path (A → B, B → C, C → A), resolved against the exchange listing.
+        
+        :return: (symbol, inverted) per leg, inverted when the market is quoted the other way
+                 round (B/A: buy B with A), or None when a leg has no market
+        """
+        legs = []
+        for coin_from, coin_to in zip(path, path[1:]):
+            if f"{coin_from}/{coin_to}" in self.markets:
+                legs.append((f"{coin_from}/{coin_to}", False))
+            elif f"{coin_to}/{coin_from}" in self.markets:
+                legs.append((f"{coin_to}/{coin_from}", True))
+            else:
+                return None
+        return legs
+    
+    def _path_symbols(self, path: List[str]) -> List[str]:
+        """Listed symbols traded along a path (empty when a leg has no market)"""
+        return [symbol for symbol, _ in self._path_legs(path) or []]
     
     def _contains_whitelisted_coin(self, path: List[str]) -> bool:
         """Check if path contains at least one whitelisted coin"""
@@ -113,57 +141,114 @@ class TriangularArbitragePathFinder:
         if not self.graph:
             raise RuntimeError("Exchange graph not initialized. Call initialize() first.")
         
-        paths = []
-        first_level = self.graph.get(self.starting_coin, set())
+        start_id = self.graph.coin_index.get(self.starting_coin)
+        if start_id is None:
+            return []
         
-        for intermediate_coin in first_level:
-            second_level = self.graph.get(intermediate_coin, set())
-            
-            for final_coin in second_level:
-                if final_coin in self.graph and self.starting_coin in self.graph[final_coin]:
-                    path = [self.starting_coin, intermediate_coin, final_coin, self.starting_coin]
-                    if self._contains_whitelisted_coin(path):
-                        paths.append(path)
+        # Enumerate on coin ids, then keep cycles with a whitelisted coin
+        triangles = self.graph.triangles(start_id)
+        whitelisted = np.zeros(len(self.graph), dtype=bool)
+        whitelisted[[self.graph.coin_index[coin] for coin in self.whitelist if coin in self.graph.coin_index]] = True
+        triangles = triangles[whitelisted[triangles].any(axis=1)]
+        
+        coins = self.graph.coins
+        return [[coins[start], coins[intermediate], coins[final], coins[start]] for start, intermediate, final in triangles.tolist()]
+    
+    async def find_arbitrage_cycles(self, max_legs: int = 5) -> List[Dict]:
+        """
+        Find profitable cycles of 3 to max_legs legs starting with the starting_coin,
+        priced at the current best bid/ask including taker fees.
+        At most one cycle is reported per closing edge and length (see `CycleEngine`).
+        
+        The first call builds the cycle engine, prices it from bulk snapshots and subscribes
+        to every market; the live books then update the engine's weights as they change, so
+        later calls only re-run the search.
+        
+        :param max_legs: Maximum number of trades in a cycle
+        :return: List of cycles (path, profit, rate, legs), best profit first
+        """
+        if not self.graph:
+            raise RuntimeError("Exchange graph not initialized. Call initialize() first.")
+        
+        if self.cycle_engine is None:
+            await self._build_cycle_engine()
+        cycles = self.cycle_engine.find_cycles(self.starting_coin, max_length=max_legs)
+        return [cycle for cycle in cycles if self._contains_whitelisted_coin(cycle['path'])]
+    
+    async def _build_cycle_engine(self):
+        """Build the cycle engine over the spot markets and keep it priced by the live books"""
+        markets = [
+            (symbol, market['base'], market['quote'])
+            for symbol, market in self.markets.items()
+            if market.get('active', True) and market.get('spot', True)
+        ]
+        fee = self.exchange.fees.get('trading', {}).get('taker', 0.001)
+        engine = CycleEngine(markets, fee)
+        
+        async def fetch_one(symbol):
+            try:
+                await get_rate_limiter(self.exchange).acquire('fetch_order_book')
+                return symbol, await self.exchange.fetch_order_book(symbol)
+            except Exception as e:
+                print(f"Error fetching order book for {symbol}: {str(e)}")
+                return symbol, None
         
-        return paths
+        # Snapshots give every weight at once; books already live are more recent than them
+        order_books = await fetch_order_book_snapshots(self.exchange, engine.symbols, fetch_one)
+        engine.update_order_books(order_books)
+        live = [symbol for symbol in engine.symbols if self.order_books.best_bid(symbol) or self.order_books.best_ask(symbol)]
+        self.cycle_engine = engine
+        for symbol in live:
+            self._on_book_update(symbol)
+        await self.order_books.subscribe(engine.symbols)
     
-    async def check_path_liquidity(self, path: List[str]) -> Tuple[float, float]:
+    def _on_book_update(self, symbol: str):
+        """Re-weight the cycle engine edges of a symbol from its live book"""
+        engine = self.cycle_engine
+        symbol_id = engine.symbol_index.get(symbol) if engine else None
+        if symbol_id is None:
+            return
+        best_bid, best_ask = self.order_books.best_bid(symbol), self.order_books.best_ask(symbol)
+        engine.set_prices(
+            np.array([symbol_id], dtype=np.intp),
+            [best_bid[0] if best_bid else np.nan],
+            [best_ask[0] if best_ask else np.nan]
+        )
+    
+    async def check_path_liquidity(self, path: List[str], wait: bool = True) -> Tuple[float, float]:
         """
         Check liquidity for a specific path and calculate potential profit
         
         :param path: The trading path to check
+        :param wait: Subscribe and wait for the path's books (False when the caller already did)
         :return: Tuple of (final_quantity, profit)
         """
         try:
-            # A → B
-            symbol1 = f"{path[0]}/{path[1]}"
-            order_book1 = await self.exchange.watch_order_book(symbol1)
-            bid_price1 = order_book1['bids'][0][0] if order_book1['bids'] else 0
-            
-            if bid_price1 == 0:
+            legs = self._path_legs(path)
+            if legs is None:
                 return (0, 0)
+            symbols = [symbol for symbol, _ in legs]
             
-            # B → C
-            symbol2 = f"{path[1]}/{path[2]}"
-            order_book2 = await self.exchange.watch_order_book(symbol2)
-            bid_price2 = order_book2['bids'][0][0] if order_book2['bids'] else 0
-            
-            if bid_price2 == 0:
-                return (0, 0)
+            # Subscribed once, later paths sharing a symbol read the live local book
+            if wait:
+                await self.order_books.subscribe(symbols)
+                await self.order_books.wait_ready(symbols, timeout=30)
             
-            # C → A
-            symbol3 = f"{path[2]}/{path[3]}"
-            order_book3 = await self.exchange.watch_order_book(symbol3)
-            bid_price3 = order_book3['bids'][0][0] if order_book3['bids'] else 0
-            
-            if bid_price3 == 0:
-                return (0, 0)
+            # Conversion rate of each leg: sell the base at the bid, or buy it at the ask when inverted
+            rates = []
+            for symbol, inverted in legs:
+                best = self.order_books.best_ask(symbol) if inverted else self.order_books.best_bid(symbol)
+                price = best[0] if best else 0
+                
+                if price == 0:
+                    return (0, 0)
+                rates.append(1 / price if inverted else price)
             
             # Calculate quantities
             qty1 = self.starting_balance
-            qty2 = qty1 * bid_price1
-            qty3 = qty2 * bid_price2
-            final_qty = qty3 * bid_price3
+            qty2 = qty1 * rates[0]
+            qty3 = qty2 * rates[1]
+            final_qty = qty3 * rates[2]
             profit = final_qty - self.starting_balance
             
             return (final_qty, profit)
@@ -172,17 +257,34 @@ class TriangularArbitragePathFinder:
             print(f"Error checking liquidity for path {path}: {str(e)}")
             return (0, 0)
     
-    async def filter_paths_by_liquidity(self, paths: List[List[str]]) -> List[Tuple[List[str], float, float]]:
+    async def filter_paths_by_liquidity(
+        self,
+        paths: List[List[str]],
+        max_concurrency: int = 50
+    ) -> List[Tuple[List[str], float, float]]:
         """
         Filter paths by checking if they have sufficient liquidity based on starting balance
         
         :param paths: List of potential paths
+        :param max_concurrency: Maximum number of paths evaluated at the same time
         :return: List of tuples (path, final_quantity, profit) with viable paths
         """
         viable_paths = []
         
-        for path in paths:
-            final_qty, profit = await self.check_path_liquidity(path)
+        # Subscribe once to every symbol used by any path, then evaluate against the shared books
+        symbols = list(dict.fromkeys(symbol for path in paths for symbol in self._path_symbols(path)))
+        await self.order_books.subscribe(symbols)
+        await self.order_books.wait_ready(symbols, timeout=30)
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def check(path):
+            async with semaphore:
+                return await self.check_path_liquidity(path, wait=False)
+        
+        # gather keeps the input order, so the stable sort below gives the same result as before
+        results = await asyncio.gather(*(check(path) for path in paths))
+        for path, (final_qty, profit) in zip(paths, results):
             if profit > 0:
                 viable_paths.append((path, final_qty, profit))
         
@@ -191,7 +293,8 @@ class TriangularArbitragePathFinder:
         return viable_paths
     
     async def close(self):
-        """Close the exchange connection"""
+        """Close the order book subscriptions and the exchange connection"""
+        await self.order_books.close()
         await self.exchange.close()
 
 async def main():
@@ -232,6 +335,11 @@ async def main():
             print(f"Final amount:    {final_qty:.8f} {path_finder.starting_coin}")
             print(f"Estimated profit: {profit:.8f} {path_finder.starting_coin} "
                   f"(+{profit/path_finder.starting_balance*100:.2f}%)")
+        
+        cycles = await path_finder.find_arbitrage_cycles(max_legs=5)
+        print(f"\nFound {len(cycles)} profitable cycles of 3 to 5 legs:")
+        for cycle in cycles:
+            print(f"{' → '.join(cycle['path'])}: {cycle['profit']*100:+.4f}%")
     
     except Exception as e:
         print(f"Error in main execution: {str(e)}")
@@ -0,0 +1,98 @@
+from collections import deque
+
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtGui import QColor, QTextCharFormat, QTextCursor
+
+
+class ConsoleLogSink(QObject):
+    """
+    Batched writer for the console QTextEdit.
+
+    Messages are queued in a bounded ring buffer and written to the widget by a timer,
+    in one edit block per flush, instead of one HTML append and cursor move per message.
+    Text is inserted as plain text with a cached character format per color (no HTML
+    parsing), consecutive duplicates are collapsed into a repeat count, and the document
+    keeps at most `max_lines` lines, dropping the oldest ones.
+    """
+
+    def __init__(self, console, max_lines=5000, flush_interval=100, buffer_size=None, parent=None):
+        """
+        Args:
+            console (QTextEdit): The console widget.
+            max_lines (int): Lines kept in the console.
+            flush_interval (int): Delay between two flushes (in milliseconds).
+            buffer_size (int): Messages queued between two flushes, defaults to max_lines.
+        """
+        super().__init__(parent or console)
+        self.console = console
+        self.console.setUndoRedoEnabled(False)  # The undo stack would keep every line ever written
+        self.console.document().setMaximumBlockCount(max_lines)
+        self.pending = deque(maxlen=buffer_size or max_lines)
+        self.dropped = 0  # Messages pushed out of the ring buffer since the last flush
+        self.formats = {}  # color -> QTextCharFormat
+        self.timer = QTimer(self)
+        self.timer.setInterval(flush_interval)
+        self.timer.timeout.connect(self.flush)
+
+    def write(self, text, color="white"):
+        """Queue a message; it is shown on the next flush."""
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append((str(text), color))
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def clear(self):
+        """Drop the queued messages and empty the console."""
+        self.pending.clear()
+        self.dropped = 0
+        self.console.clear()
+
+    def _format(self, color):
+        char_format = self.formats.get(color)
+        if char_format is None:
+            char_format = QTextCharFormat()
+            char_format.setForeground(QColor(color))
+            self.formats[color] = char_format
+        return char_format
+
+    def _coalesce(self):
+        """Drain the buffer into (text, color, repeats) runs."""
+        runs = []
+        while self.pending:
+            text, color = self.pending.popleft()
+            if runs and runs[-1][0] == text and runs[-1][1] == color:
+                runs[-1][2] += 1
+            else:
+                runs.append([text, color, 1])
+        return runs
+
+    def flush(self):
+        """Write every queued message to the console in a single edit block."""
+        if not self.pending:
+            self.timer.stop()  # Idle until the next message
+            return
+        dropped, self.dropped = self.dropped, 0
+        runs = self._coalesce()
+
+        document = self.console.document()
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.beginEditBlock()
+        first_line = document.isEmpty()
+        if dropped:
+            if not first_line:
+                cursor.insertBlock()
+            cursor.insertText(f"... {dropped} messages skipped", self._format("orange"))
+            first_line = False
+        for text, color, repeats in runs:
+            if not first_line:
+                cursor.insertBlock()
+            first_line = False
+            # insertText turns "\n" into new blocks, so multi-line messages count against max_lines
+            cursor.insertText(text if repeats == 1 else f"{text} (x{repeats})", self._format(color))
+        cursor.endEditBlock()
+
+        self.console.setTextCursor(cursor)
+        scroll_bar = self.console.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
@@ -0,0 +1,79 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+
+class LatestValueBridge(QObject):
+    """
+    Hands keyed state from a worker thread to the GUI thread, latest value wins.
+
+    `publish` (any thread) overwrites the key's slot in a plain dict, so a record that is
+    updated a thousand times before the GUI looks at it costs one slot, not a thousand
+    queued signals. Only the first publish after a drain posts a notification to the GUI
+    thread; the GUI then drains every slot once per frame and emits `updated` with the
+    latest records. The queued event count and the memory held are therefore bounded by
+    the frame rate and the number of keys, whatever the feed rate.
+
+    Must be created in the GUI thread. Discrete events (log lines, errors) should keep
+    using regular queued signals, since intermediate values are dropped here.
+    """
+
+    updated = pyqtSignal(list)  # Latest records published since the previous frame
+    removed = pyqtSignal(list)  # Keys removed since the previous frame
+    _dirty_signal = pyqtSignal()
+
+    def __init__(self, frame_interval=50, parent=None):
+        """
+        Args:
+            frame_interval (int): Minimum delay between two GUI updates (in milliseconds).
+        """
+        super().__init__(parent)
+        self.slots = {}  # key -> latest record
+        self.dirty = False
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(frame_interval)
+        self.timer.timeout.connect(self._drain)
+        # Emitted from the worker thread, delivered in the GUI thread
+        self._dirty_signal.connect(self._schedule)
+
+    def publish(self, key, record):
+        """Replace the latest record of a key (callable from any thread)."""
+        self.slots[key] = record  # Single dict store, atomic under the GIL
+        self._mark_dirty()
+
+    def remove(self, key):
+        """Drop a key (callable from any thread); a later publish of the key wins over it."""
+        self.slots[key] = None
+        self._mark_dirty()
+
+    def _mark_dirty(self):
+        if not self.dirty:
+            self.dirty = True
+            self._dirty_signal.emit()
+
+    def _schedule(self):
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def _drain(self):
+        # Clear the flag before draining: a publish racing with the drain posts a new notification
+        self.dirty = False
+        records, removed = [], []
+        while self.slots:
+            try:
+                key, record = self.slots.popitem()
+            except KeyError:
+                break
+            if record is None:
+                removed.append(key)
+            else:
+                records.append(record)
+        if removed:
+            self.removed.emit(removed)
+        if records:
+            self.updated.emit(records)
+
+    def clear(self):
+        """Drop the pending records."""
+        self.timer.stop()
+        self.slots.clear()
+        self.dirty = False
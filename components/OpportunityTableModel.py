@@ -0,0 +1,169 @@
+from bisect import bisect_right
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+
+class OpportunityTableModel(QAbstractTableModel):
+    """
+    Opportunity board for a QTableView.
+
+    Rows are structured records (dicts) keyed by one or more fields, e.g. the symbol or the
+    triangle. `upsert` updates a known row in place and only signals the cells whose value
+    changed through `dataChanged`; new rows are inserted at their sorted position and a row
+    whose sort value changed is moved, so the view never rebuilds widgets. Sorting is done
+    in the model (`sort` is what a QTableView with sorting enabled calls on header clicks).
+    """
+
+    def __init__(self, columns, key_fields, max_rows=None, parent=None):
+        """
+        Args:
+            columns (list): (header, record field) of every column, optionally with a
+                format string as third item, e.g. ("Profit", "profit", "{:.6f}").
+            key_fields (tuple): Record fields identifying a row.
+            max_rows (int): Rows kept; the last rows in sort order are dropped beyond it.
+        """
+        super().__init__(parent)
+        self.columns = [column if len(column) == 3 else (*column, None) for column in columns]
+        self.key_fields = tuple(key_fields)
+        self.max_rows = max_rows
+        self.rows = []  # Records in display order
+        self.keys = []  # Row key of each record
+        self.row_of = {}  # Row key -> row number
+        self.sort_column = None
+        self.sort_order = Qt.SortOrder.AscendingOrder
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        _, field, value_format = self.columns[index.column()]
+        value = self.rows[index.row()].get(field)
+        if role == Qt.ItemDataRole.DisplayRole:
+            if value is None:
+                return ""
+            if value_format and isinstance(value, (int, float)):
+                return value_format.format(value)
+            return str(value)
+        if role == Qt.ItemDataRole.UserRole:
+            return value  # Raw value
+        if role == Qt.ItemDataRole.TextAlignmentRole and isinstance(value, (int, float)):
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column, self.sort_order = column, order
+        new_order = sorted(range(len(self.rows)), key=lambda row: self._sort_key(self.rows[row]))
+        self.rows = [self.rows[row] for row in new_order]
+        self.keys = [self.keys[row] for row in new_order]
+        self._reindex(0, len(self.rows))
+        # Keep the selection and the current index on the same records
+        new_rows = {old_row: new_row for new_row, old_row in enumerate(new_order)}
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent, [self.index(new_rows[index.row()], index.column()) for index in persistent]
+        )
+        self.layoutChanged.emit()
+
+    # Updates
+
+    def upsert(self, record):
+        """Insert or update the row of a record."""
+        key = self._key(record)
+        row = self.row_of.get(key)
+        if row is None:
+            self._insert(key, record)
+            return
+
+        current = self.rows[row]
+        changed = [column for column, (_, field, _) in enumerate(self.columns) if current.get(field) != record.get(field)]
+        if not changed:
+            return
+        sort_changed = self.sort_column in changed
+        self.rows[row] = record
+        if sort_changed:
+            row = self._move(row)
+        self.dataChanged.emit(self.index(row, min(changed)), self.index(row, max(changed)))
+
+    def upsert_many(self, records):
+        for record in records:
+            self.upsert(record)
+
+    def remove(self, key):
+        """Remove the row of a key (tuple of the key field values, lists as tuples)."""
+        key = tuple(key)
+        row = self.row_of.get(key)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row], self.keys[row]
+        self._reindex(row, len(self.rows))
+        del self.row_of[key]
+        self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows.clear()
+        self.keys.clear()
+        self.row_of.clear()
+        self.endResetModel()
+
+    # Helpers
+
+    def _key(self, record):
+        # Lists (e.g. the triangle symbols) are made hashable
+        return tuple(tuple(value) if isinstance(value, list) else value for value in map(record.get, self.key_fields))
+
+    def _sort_key(self, record):
+        if self.sort_column is None:
+            return 0  # Unsorted: bisect_right appends
+        value = record.get(self.columns[self.sort_column][1])
+        # Numbers sort by value, anything else ("no opportunity", None) after them
+        if isinstance(value, (int, float)):
+            return (0, -value if self.sort_order == Qt.SortOrder.DescendingOrder else value)
+        return (1, str(value))
+
+    def _reindex(self, start, stop):
+        for row in range(start, stop):
+            self.row_of[self.keys[row]] = row
+
+    def _insert(self, key, record):
+        row = bisect_right(self.rows, self._sort_key(record), key=self._sort_key)
+        if self.max_rows is not None and row >= self.max_rows:
+            return  # Would be dropped right away
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.insert(row, record)
+        self.keys.insert(row, key)
+        self._reindex(row, len(self.rows))
+        self.endInsertRows()
+        if self.max_rows is not None and len(self.rows) > self.max_rows:
+            self.remove(self.keys[-1])
+
+    def _move(self, row):
+        """Move a row whose sort value changed to its sorted position. Returns the new row."""
+        record, key = self.rows.pop(row), self.keys.pop(row)
+        target = bisect_right(self.rows, self._sort_key(record), key=self._sort_key)
+        self.rows.insert(row, record)
+        self.keys.insert(row, key)
+        if target == row:
+            return row
+        # beginMoveRows takes the destination in the layout before the move
+        self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), target if target < row else target + 1)
+        del self.rows[row], self.keys[row]
+        self.rows.insert(target, record)
+        self.keys.insert(target, key)
+        self._reindex(min(row, target), max(row, target) + 1)
+        self.endMoveRows()
+        return target
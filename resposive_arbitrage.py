@@ -4,8 +4,7 @@ from PyQt6.QtWidgets import (
     QApplication, 
     QMainWindow,
     QGridLayout, 
-    QTableWidget, 
-    QTableWidgetItem, 
+    QTableView,
     QDoubleSpinBox,
     QWidget, 
     QLabel, 
@@ -13,9 +12,11 @@ from PyQt6.QtWidgets import (
     QHeaderView
 )
 from pyqt6_multiselect_combobox import MultiSelectComboBox
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtCore import QThread, pyqtSignal, Qt
 import ccxt.async_support as ccxt
 
+from components.OpportunityTableModel import OpportunityTableModel
+
 from utils.exchanges import exchanges_list, order_sizes, build_list_of_exchanges_from_selection
 from utils.environement import load_environment
 from utils.exchanges import symbols
@@ -197,13 +198,16 @@ class MainWindow(QMainWindow):
         self.close_btn.clicked.connect(self.stop_task) # type: ignore
         self.start_btn.clicked.connect(self.start_task) # type: ignore
         
-        # Table setup
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
-            "Symbol", "Exchange 1", "Best Ask",
-            "Exchange 2", "Best Bid", "Profit"
-        ])
+        # Table setup: one row per symbol, updated in place and sorted by the model
+        self.table_model = OpportunityTableModel([
+            ("Symbol", "symbol"), ("Exchange 1", "buy"), ("Best Ask", "min_price"),
+            ("Exchange 2", "sell"), ("Best Bid", "max_price"), ("Profit", "profit")
+        ], key_fields=("symbol",), max_rows=100)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(5, Qt.SortOrder.DescendingOrder)  # Best profit first
+        self.table.verticalHeader().setVisible(False)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         
         layout.addWidget(self.table, 4, 0, 1, 5)
@@ -216,20 +220,8 @@ class MainWindow(QMainWindow):
         self.fetcher.data_fetched.connect(self.update_table) # type: ignore
 
     def update_table(self, data):
-        
-        # Insert new row at the top
-        self.table.insertRow(0)
-        self.table.setItem(0, 0, QTableWidgetItem(f"{data['symbol']}"))
-        self.table.setItem(0, 1, QTableWidgetItem(f"{data['buy']}"))
-        self.table.setItem(0, 2, QTableWidgetItem(f"{data['min_price']}"))
-        self.table.setItem(0, 3, QTableWidgetItem(f"{data['sell']}"))
-        self.table.setItem(0, 4, QTableWidgetItem(f"{data['max_price']}"))
-        self.table.setItem(0, 5, QTableWidgetItem(f"{data['profit']}"))
-
-        # Limit rows to a maximum number to prevent UI overload
-        max_rows = 100
-        if self.table.rowCount() > max_rows:
-            self.table.removeRow(self.table.rowCount() - 1)
+        # Only the cells that changed are repainted; the model caps the board at 100 rows
+        self.table_model.upsert(data)
     
     def list_selected_exchanges(self):
         return build_list_of_exchanges_from_selection(self.list_exchanges_box.currentData())
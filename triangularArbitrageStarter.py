@@ -9,15 +9,21 @@ if sys.platform.startswith('win'):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 from PyQt6.QtCore import pyqtSignal, QSize, QThread
-from PyQt6.QtGui import QIcon, QTextCursor
+from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QDialog, QMessageBox, QTableWidgetItem, QHBoxLayout, QPushButton
 
 from qasync import QEventLoop, asyncSlot
 import ccxt.pro as ccxtpro
 from ui.main_window import Ui_MainWindow
+from components.ConsoleLogSink import ConsoleLogSink
 from ui.manage_api import Ui_api_keys_list
 from ui.new_exchange import Ui_new_echange_window
 from utils.utils import connect_or_create_db, list_available_coins, available_trading_pairs, tradable_pairs
+from utils.triangle_evaluator import TriangleEvaluator
+from utils.market_cache import load_markets
+from utils.book_snapshots import fetch_order_book_snapshots
+from utils.rate_limiter import get_rate_limiter
+from utils.sharded_scanner import ShardedScanner
 
 # Database Path
 DB_PATH = "data/crypto_boy.sqlite"
@@ -35,6 +41,7 @@ class MainWindow(QMainWindow):
         self.worker = None
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
+        self.console_sink = ConsoleLogSink(self.ui.console)
         self.populate_list_exchanges()
         self.populate_list_coins()
         self.pre_set_black_list_symbols()
@@ -89,11 +96,10 @@ class MainWindow(QMainWindow):
         cursor = connection.cursor()
         cursor.execute("SELECT * FROM exchanges_api_config WHERE exchange_ext_id = ?", (exchange_id,))
         config = cursor.fetchone()
-        api_config = {}
+        api_config = {'enableRateLimit': False}  # Paced by the shared token bucket (utils.rate_limiter)
         if config:
             api_config['apiKey'] = config[1]
             api_config['secret'] = config[2]
-            api_config['enableRateLimit'] = True
             api_config['uid'] = config[3] or None
             api_config['login'] = config[6] or None
             api_config['password'] = config[7] or None
@@ -156,12 +162,8 @@ class MainWindow(QMainWindow):
         print(len(self.trade_able_pairs))
 
     def print_to_console(self, text, color="white"):
-        console_output_template = f"<span style='color: {color}'>{text}</span>"
-        self.ui.console.append(console_output_template)
-
-        cursor = self.ui.console.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        self.ui.console.setTextCursor(cursor)
+        # Queued and written to the console in batches (see ConsoleLogSink)
+        self.console_sink.write(text, color)
 
     def reset_selection(self):
         self.ui.black_list_symbols.clear()
@@ -530,7 +532,8 @@ class ArbitrageWorker(QThread):
     result_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
 
-    def __init__(self, exchange, exchange_config, black_listed_coins, sandbox_mode=True, min_trade_volume_threshold=1):
+    def __init__(self, exchange, exchange_config, black_listed_coins, sandbox_mode=True, min_trade_volume_threshold=1,
+                 scan_processes=1):
         super().__init__()
         self.exchange = None
         self.running = True
@@ -539,16 +542,19 @@ class ArbitrageWorker(QThread):
         self.exchange = exchange
         self.exchange_config = exchange_config
         self.min_trade_volume_threshold = min_trade_volume_threshold  # Default threshold
+        self.evaluator = None  # Built on the first scan, then updated incrementally
+        self.scan_processes = scan_processes  # More than 1 shards the pricing across processes
 
     async def initialize_exchange(self):
         """Initialize the exchange."""
         self.exchange = getattr(ccxtpro, self.exchange)(self.exchange_config)
         print(self.exchange)
-        await self.exchange.load_markets()
+        await load_markets(self.exchange)
 
     async def fetch_order_book(self, pair):
         """Fetch the order book for a given pair."""
         try:
+            await get_rate_limiter(self.exchange).acquire('fetch_order_book')
             return pair, await self.exchange.fetch_order_book(pair)
         except Exception as e:
             logging.error(f"Error fetching order book for {pair}: {e}")
@@ -564,10 +570,11 @@ class ArbitrageWorker(QThread):
             exchange = exchange_class({
                 'apiKey': api_key,
                 'secret': secret,
-                'enableRateLimit': True,
+                'enableRateLimit': False,  # Paced by the shared token bucket
             })
 
-            await exchange.load_markets()
+            await load_markets(exchange)
+            await get_rate_limiter(exchange).acquire('fetch_balance')
             balance = await exchange.fetch_balance()
             portfolio = balance['total']  # Total balance (available + reserved)
 
@@ -616,62 +623,31 @@ class ArbitrageWorker(QThread):
     async def calculate_arbitrage_profit(self, triangular_pairs):
         fees = self.exchange.fees.get('trading', {}).get('taker', 0.001)  # Default fee
         all_pairs = set(triangle[pair] for triangle in triangular_pairs for pair in ['pair_a', 'pair_b', 'pair_c'])
-        tasks = [self.fetch_order_book(pair) for pair in all_pairs]
-        order_books = await asyncio.gather(*tasks)
-        order_book_dict = {pair: book for pair, book in order_books if book is not None}
-
-        profitable_trades = []
-
-        for triangle in triangular_pairs:
-            pair_a, pair_b, pair_c = triangle["pair_a"], triangle["pair_b"], triangle["pair_c"]
-            order_book_a, order_book_b, order_book_c = order_book_dict.get(pair_a), order_book_dict.get(pair_b), order_book_dict.get(pair_c)
-            if not order_book_a or not order_book_b or not order_book_c:
-                continue
-
-            min_volume_a = self.get_dynamic_min_volume(order_book_a)
-            min_volume_b = self.get_dynamic_min_volume(order_book_b)
-            min_volume_c = self.get_dynamic_min_volume(order_book_c)
-
-            # Check against the minimum trade volume threshold
-            if min_volume_a < self.min_trade_volume_threshold or \
-                    min_volume_b < self.min_trade_volume_threshold or \
-                    min_volume_c < self.min_trade_volume_threshold:
-                continue
-
-            a_ask = order_book_a['asks'][0][0] if order_book_a['asks'] else None
-            b_bid = order_book_b['bids'][0][0] if order_book_b['bids'] else None
-            c_bid = order_book_c['bids'][0][0] if order_book_c['bids'] else None
-
-            if not (a_ask and b_bid and c_bid):
-                continue
-
-            start_amount = 1.0
-            amount_b = (start_amount / a_ask) * (1 - fees)
-            amount_c = (amount_b * b_bid) * (1 - fees)
-            end_amount = (amount_c * c_bid) * (1 - fees)
-            profit = end_amount - start_amount
-
-            if profit > 0:
-                profitable_trades.append({
-                    "triangle": triangle,
-                    "profit": profit,
-                    "details": {
-                        "start_amount": start_amount,
-                        "end_amount": end_amount,
-                        "a_ask": a_ask,
-                        "b_bid": b_bid,
-                        "c_bid": c_bid,
-                        "min_volume_a": min_volume_a,
-                        "min_volume_b": min_volume_b,
-                        "min_volume_c": min_volume_c
-                    }
-                })
-
-        return profitable_trades
+        order_book_dict = await fetch_order_book_snapshots(self.exchange, all_pairs, self.fetch_order_book)
+
+        if self.evaluator is None:
+            # First scan: build the triangle index and price everything once
+            if self.scan_processes > 1:
+                self.evaluator = ShardedScanner(triangular_pairs, self.scan_processes)
+            else:
+                self.evaluator = TriangleEvaluator(triangular_pairs)
+            self.evaluator.load_order_books(order_book_dict)
+            profitable_trades = self.evaluator.evaluate(fees, self.min_trade_volume_threshold)
+            # The sharded scanner answers asynchronously
+            return await profitable_trades if self.scan_processes > 1 else profitable_trades
+
+        # Later scans only re-price the triangles whose books moved
+        repriced = self.evaluator.apply_book_updates({pair: order_book_dict.get(pair) for pair in all_pairs})
+        if self.scan_processes > 1:
+            await repriced
+        return self.evaluator.ranked_opportunities()
 
     async def get_triangulation_opportunities(self):
-        available_pairs = list(self.exchange.markets.keys())
-        triangular_pairs = tradable_pairs(available_pairs)
+        if self.evaluator is None:
+            available_pairs = list(self.exchange.markets.keys())
+            triangular_pairs = tradable_pairs(available_pairs)
+        else:
+            triangular_pairs = self.evaluator.triangular_pairs
         return await self.calculate_arbitrage_profit(triangular_pairs)
 
     async def run_arbitrage(self):
@@ -692,6 +668,8 @@ class ArbitrageWorker(QThread):
         except Exception as e:
             self.error_signal.emit(str(e))
         finally:
+            if isinstance(self.evaluator, ShardedScanner):
+                self.evaluator.close()
             if self.exchange:
                 await self.exchange.close()
 
@@ -118,9 +118,17 @@ class Ui_MainWindow(object):
         self.result_set_wrapper.setFrameShape(QtWidgets.QFrame.Shape.StyledPanel)
         self.result_set_wrapper.setFrameShadow(QtWidgets.QFrame.Shadow.Raised)
         self.result_set_wrapper.setObjectName("result_set_wrapper")
+        self.opportunity_board = QtWidgets.QTableView(parent=self.result_set_wrapper)
+        self.opportunity_board.setGeometry(QtCore.QRect(0, 0, 1011, 171))
+        self.opportunity_board.setSortingEnabled(True)
+        self.opportunity_board.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.opportunity_board.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.opportunity_board.verticalHeader().setVisible(False)
+        self.opportunity_board.horizontalHeader().setStretchLastSection(True)
+        self.opportunity_board.setObjectName("opportunity_board")
         self.console = QtWidgets.QTextEdit(parent=self.result_set_wrapper)
         self.console.setEnabled(True)
-        self.console.setGeometry(QtCore.QRect(0, 0, 1011, 351))
+        self.console.setGeometry(QtCore.QRect(0, 171, 1011, 180))
         font = QtGui.QFont()
         font.setPointSize(9)
         self.console.setFont(font)
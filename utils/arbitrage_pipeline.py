@@ -0,0 +1,444 @@
+import asyncio
+import inspect
+import logging
+from datetime import datetime
+
+import ccxt.pro as ccxtpro
+import numpy as np
+
+from utils.triangle_evaluator import TriangleEvaluator
+from utils.sharded_scanner import ShardedScanner
+from utils.triangle_cache import get_compiled_triangles
+from utils.market_cache import load_markets
+from utils.exchange_pool import borrow_exchange
+from utils.rate_limiter import get_rate_limiter
+from utils.book_snapshots import fetch_order_book_snapshots
+from utils.order_book_cache import OrderBookCache
+from utils.top_of_book_feed import SharedTopOfBook, TopOfBookFeed, row_order_book
+
+# Scan pipeline shared by the desktop app and the headless runner (no Qt imports here)
+
+# Function OK
+async def fetch_spot_markets(exchange_id):
+    # Borrow the public session of the exchange
+    exchange = borrow_exchange(exchange_id, {
+        'enableRateLimit': False,  # Paced by the shared token bucket (utils.rate_limiter)
+    })
+
+    try:
+        # Fetch all markets (served from the shared market cache when fresh)
+        markets = await load_markets(exchange)
+
+        # Filter for spot markets
+        spot_markets = [market for market in markets.values() if market['spot']]
+
+        # Extract trading pairs
+        spot_pairs = [market['symbol'] for market in spot_markets]
+
+        return spot_pairs
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+async def run_arbitrage(running, exchange_id, exchange_config, result_signal, error_signal, min_trade_volume_threshold, running_tasks, black_listed_coins, trade_signal=None, removed_signal=None, trade_amounts=None, scan_processes=1, top_of_book=None):
+    """
+    Run the arbitrage detection and emit results.
+    trade_signal, when given, receives every profitable trade record and its update time
+    instead of the formatted console text sent through result_signal. removed_signal, when
+    given, receives the last record sent for a triangle once it stops being profitable.
+    trade_amounts ({coin: amount}) sets the trade size of the cycles starting from a coin,
+    the other cycles are sized with the balance of their starting coin.
+    scan_processes above 1 shards the pricing over that many processes (see ShardedScanner).
+    top_of_book, when given, streams the books from a shared-memory top of book instead of
+    websockets: True starts a feed for the scan's pairs, a block name attaches to a running one.
+    """
+    print("run_arbitrage")
+    if trade_signal is None:
+        trade_signal = lambda trade, updated_at: result_signal(format_profitable_trade(trade, updated_at))
+    exchange = get_exchange(exchange_id, exchange_config, result_signal)
+    evaluator = None
+    try:
+        await initialize_exchange(exchange, result_signal)
+        result_signal("Market Data fetched !")
+        result_signal("Building and analizing triangular opportunities")
+        task = asyncio.create_task(get_triangulation_opportunities(exchange, min_trade_volume_threshold, result_signal, running_tasks, black_listed_coins, trade_amounts, scan_processes))
+        running_tasks.add(task)
+        task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
+        try:
+            evaluator, profitable_trades = await task
+        except ValueError as e:
+            result_signal(f'{e}')
+            return
+        updated_at = datetime.now()
+        for trade in profitable_trades:
+            trade_signal(trade, updated_at)
+
+        # Keep the books live and re-price the affected triangles on every update
+        if top_of_book:
+            stream = stream_top_of_book_opportunities(
+                exchange_id, exchange_config, evaluator, running, result_signal, top_of_book,
+                trade_signal=trade_signal, removed_signal=removed_signal
+            )
+        else:
+            stream = stream_arbitrage_opportunities(
+                exchange, evaluator, running, result_signal, running_tasks, trade_signal=trade_signal, removed_signal=removed_signal
+            )
+        task = asyncio.create_task(stream)
+        running_tasks.add(task)
+        task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
+        await task
+    except asyncio.CancelledError:
+        result_signal("Arbitrage task was stopped.")
+    except Exception as e:
+        print(f"arbitrage detection error : {e}")
+        logging.info(f"arbitrage detection error : {e}")
+        error_signal(f"arbitrage detection error : {str(e)}")
+    finally:
+        if isinstance(evaluator, ShardedScanner):
+            evaluator.close()  # Stop the shard processes and free the shared books
+
+# Function Call OK
+async def get_triangulation_opportunities(exchange, min_trade_volume_threshold, result_signal, running_tasks, white_listed_coins, trade_amounts=None, scan_processes=1):
+    print("get_triangulation_opportunities")
+    available_pairs = [symbol for symbol, market in exchange.markets.items() if market.get('active') is not False]
+    task = asyncio.create_task(get_portfolio_and_choose_coin(
+        exchange, min_trade_volume_threshold, running_tasks
+    ))
+    running_tasks.add(task)
+    task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
+
+    best_coin, best_coin_balance, eligible_coins = await task
+    if best_coin and best_coin_balance and eligible_coins :
+        result_signal(f"Best suited coin in your ballance is {best_coin} with a balance of {best_coin_balance}")
+        result_signal(f"Other eligible coins are {', '.join(eligible_coins)}")
+    else:
+        result_signal(f"Your portfolio does not seems to have any balance, check your API KEY/ API Secret for potential error !")
+    try:
+        # Discovery only runs when the listings or coin lists changed since the last scan
+        compiled_triangles, warm_start = get_compiled_triangles(exchange.id, available_pairs, eligible_coins, white_listed_coins)
+        if warm_start:
+            result_signal('Triangle index loaded from cache')
+        # result_signal carries text (a pyqtSignal(str) in the desktop app), send a summary
+        result_signal(f"{len(compiled_triangles.triangular_pairs)} triangular paths to evaluate")
+    except ValueError as err:
+        result_signal(f"The exchange you selected does not contain any coin : {err}")
+        raise ValueError('Arbitrage aborted not enough coins on the exchange to perform actions')
+    # Walk the depth with the size actually traded from each starting coin
+    start_amount = {**eligible_coins, **(trade_amounts or {})}
+    return await calculate_arbitrage_profit(exchange, compiled_triangles, min_trade_volume_threshold, result_signal, running_tasks, start_amount, scan_processes)
+
+# function OK
+async def get_portfolio_and_choose_coin(exchange, min_trade_volume_threshold, running_tasks):
+    """
+    Fetch the user's portfolio and determine eligible coins for trading.
+    Returns:
+        tuple: (best coin, its balance, {eligible coin: balance}).
+    """
+    print("get_portfolio_and_choose_coin")
+    try:
+        # await exchange.load_markets()
+        await get_rate_limiter(exchange).acquire('fetch_balance')
+        task = asyncio.create_task(exchange.fetch_balance())
+        running_tasks.add(task)
+        task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
+        
+        balance = await task
+        portfolio = balance['total']  # Total balance (available + reserved)
+
+        # Filter coins eligible for arbitrage
+        eligible_coins = {coin: amount for coin, amount in portfolio.items() if amount >= min_trade_volume_threshold}
+
+        if not eligible_coins:
+            return None, 0, {}
+
+        # Choose the best coin for arbitrage (e.g., highest balance)
+        best_coin = max(eligible_coins, key=eligible_coins.get)
+        best_coin_balance = eligible_coins[best_coin]
+
+        #to-do : for testing purpose
+        return 'SOL', 100, {coin: portfolio.get(coin, 0) for coin in ['SOL', 'USDT', 'BTC', 'ETH']}
+        
+        return best_coin, best_coin_balance, eligible_coins
+
+    except Exception as e:
+        print(f"Error fetching portfolio: {e}")
+        logging.info(f"Error fetching portfolio: {e}")
+        return None, 0, {}
+
+# Global Variables
+order_book_cache = OrderBookCache(ttl=2)  # Order books per (exchange, pair, depth), fresh for 2 seconds
+max_book_age = 10  # Triangles priced from books older than this (in seconds) are rejected
+in_flight = {}  # (exchange, pair) -> task fetching that order book, shared by concurrent callers
+
+
+async def fetch_order_book(
+    exchange,
+    pair,
+    result_signal,
+    running_tasks,
+    retries=3,
+    backoff=1,
+):
+    """
+    Fetch the order book for a given pair with rate limiting, caching, and retries.
+    Requests are paced by the exchange's weight-aware token bucket, and concurrent
+    callers asking for the same pair on the same exchange share a single request.
+    Args:
+        exchange: The exchange instance.
+        pair: The trading pair (e.g., 'BTC/USDT').
+        retries: Number of retries on failure.
+        backoff: Base delay for exponential backoff (in seconds).
+    Returns:
+        The order book for the given pair or None on failure.
+    """
+    print(f"Fetching order book for pair: {pair}")
+    result_signal(f"Fetching order book for pair: {pair}")
+    # Check if the pair is in the cache and still valid
+    cached_order_book = order_book_cache.get(exchange.id, pair)
+    if cached_order_book is not None:
+        logging.info(f"Using cached order book for pair: {pair}")
+        return pair, cached_order_book  # Return as a tuple
+
+    # Join the request already in flight for this pair, or start it
+    key = (exchange, pair)
+    task = in_flight.get(key)
+    if task is None:
+        task = asyncio.create_task(fetch_order_book_with_retries(exchange, pair, result_signal, running_tasks, retries, backoff))
+        in_flight[key] = task
+        running_tasks.add(task)
+        task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
+        task.add_done_callback(lambda t: in_flight.pop(key, None))
+    else:
+        logging.info(f"Joining in-flight order book request for pair: {pair}")
+
+    # Shielded so that one cancelled caller does not cancel the request for the others
+    return pair, await asyncio.shield(task)  # Return as a tuple
+
+
+async def fetch_order_book_with_retries(exchange, pair, result_signal, running_tasks, retries, backoff):
+    """
+    Request the order book from the exchange, retrying with exponential backoff.
+    Returns:
+        The order book for the given pair or None on failure.
+    """
+    limiter = get_rate_limiter(exchange)
+    for attempt in range(1, retries + 1):
+        try:
+            await limiter.acquire('fetch_order_book')
+            logging.info(f"Fetching order book for pair: {pair} (Attempt {attempt})")
+            result_signal(f"Fetching order book for pair: {pair} (Attempt {attempt})")
+
+            task = asyncio.create_task(exchange.fetch_order_book(pair))
+            running_tasks.add(task)
+            task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
+
+            order_book = await task
+
+            # Cache the result
+            order_book_cache.put(exchange.id, pair, order_book)
+
+            return order_book
+        except Exception as e:
+            logging.error(
+                f"Error fetching order book for {pair} on attempt {attempt}: {e}"
+            )
+            if isinstance(e, ccxtpro.DDoSProtection):
+                # 429 / 418: hold every request to this exchange, not only this pair
+                limiter.penalize(backoff * (2 ** (attempt - 1)))
+            if attempt < retries:
+                await asyncio.sleep(backoff * (2 ** (attempt - 1)))  # Exponential backoff
+            else:
+                logging.error(f"Failed to fetch order book for pair: {pair} after {retries} retries.")
+                return None
+
+async def calculate_arbitrage_profit(exchange, triangular_pairs, min_trade_volume_threshold, result_signal, running_tasks, start_amount=1.0, scan_processes=1):
+    result_signal("calculating arbitrage profit starting...")
+    fees = exchange.fees.get('trading', {}).get('taker', 0.001)  # Default fee
+    print("fees")
+    print(fees)
+    if scan_processes > 1:
+        result_signal(f"Pricing sharded over {scan_processes} processes")
+        evaluator = ShardedScanner(triangular_pairs, scan_processes, max_book_age=max_book_age)
+    else:
+        evaluator = TriangleEvaluator(triangular_pairs, max_book_age=max_book_age)
+    try:
+        # One or a few bulk requests when the exchange supports them, per-symbol requests otherwise
+        order_book_dict = await fetch_order_book_snapshots(
+            exchange,
+            evaluator.symbols,
+            lambda pair: fetch_order_book(exchange, pair, result_signal, running_tasks)
+        )
+        limiter = get_rate_limiter(exchange)
+        result_signal(f"Rate limit headroom: {limiter.headroom():.1f}/{limiter.capacity:.1f}")
+        result_signal(f"Order book cache: {order_book_cache.stats()}")
+        # print('Order book : ')
+        # print(order_book_dict)
+        # Price every triangle in one batch against the fetched top of book
+        evaluator.load_order_books(order_book_dict)
+        profitable_trades = await _resolve(evaluator.evaluate(fees, min_trade_volume_threshold, start_amount))
+    except BaseException:
+        if isinstance(evaluator, ShardedScanner):
+            evaluator.close()  # Not handed to the caller, which would close it
+        raise
+
+    # The evaluator is kept so that streaming updates only re-price the triangles they touch
+    return evaluator, profitable_trades
+
+
+async def stream_arbitrage_opportunities(exchange, evaluator, running, result_signal, running_tasks, retry_delay=1, trade_signal=None, removed_signal=None):
+    """
+    Keep a websocket order-book subscription for every symbol of the triangle set and
+    re-price the triangles containing a symbol each time its book is updated.
+    Args:
+        exchange: The ccxt.pro exchange instance.
+        evaluator: TriangleEvaluator (or ShardedScanner) primed with the initial snapshot.
+        running: Callable returning False once the scan is stopped.
+        result_signal: Function to emit the refreshed opportunities.
+        retry_delay: Delay before re-subscribing after a websocket error (in seconds).
+        trade_signal: Function called with (trade, updated_at) for every refreshed opportunity,
+            defaults to emitting the formatted trade through result_signal.
+        removed_signal: Function called with (last trade sent, updated_at) when a re-priced
+            triangle is no longer profitable.
+    """
+    if trade_signal is None:
+        trade_signal = lambda trade, updated_at: result_signal(format_profitable_trade(trade, updated_at))
+    if not exchange.has.get('watchOrderBook'):
+        raise ValueError(f"{exchange.id} does not support streaming order books")
+
+    result_signal(f"Streaming order books for {len(evaluator.symbols)} pairs...")
+    # Subscribed books are pushed on every change, so a quiet book is current rather than stale
+    evaluator.max_book_age = None
+    shown = dict(evaluator.opportunities)  # triangle id -> last trade sent, seeded with the initial scan
+
+    async def watch_symbol(symbol):
+        while running():
+            try:
+                order_book = await exchange.watch_order_book(symbol)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error watching order book for {symbol}: {e}")
+                await asyncio.sleep(retry_delay)
+                continue
+
+            triangle_ids = await _resolve(evaluator.apply_book_updates({symbol: order_book}))
+            updated_at = datetime.fromtimestamp((order_book.get('timestamp') or exchange.milliseconds()) / 1000)
+            emit_repriced(evaluator, triangle_ids, shown, updated_at, trade_signal, removed_signal)
+
+    tasks = [asyncio.create_task(watch_symbol(symbol)) for symbol in evaluator.symbols]
+    for task in tasks:
+        running_tasks.add(task)
+        task.add_done_callback(lambda t: running_tasks.discard(t))  # Remove task from the set when done
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def stream_top_of_book_opportunities(exchange_id, exchange_config, evaluator, running, result_signal, top_of_book=True, poll_interval=0.05, trade_signal=None, removed_signal=None):
+    """
+    Re-price the triangles from a shared-memory top of book (see utils.top_of_book_feed)
+    instead of opening websocket subscriptions in this process.
+    Args:
+        exchange_id (str): ccxt exchange id, for the feed process.
+        exchange_config (dict): ccxt options of the feed process.
+        evaluator: TriangleEvaluator (or ShardedScanner) primed with the initial snapshot.
+        running: Callable returning False once the scan is stopped.
+        result_signal: Function to emit progress messages.
+        top_of_book (bool | str): True starts a feed process for the scan's pairs, a string
+            attaches to the block of a feed already running on the host (no extra connection).
+        poll_interval: Delay between two reads of the shared matrix (in seconds).
+        trade_signal: See stream_arbitrage_opportunities.
+        removed_signal: See stream_arbitrage_opportunities.
+    """
+    if trade_signal is None:
+        trade_signal = lambda trade, updated_at: result_signal(format_profitable_trade(trade, updated_at))
+    feed = None
+    if top_of_book is True:
+        feed = TopOfBookFeed(exchange_id, exchange_config, evaluator.symbols)
+        feed.start()
+        shared = feed.top_of_book
+        result_signal(f"Top of book feed started, other scanners can attach to block {feed.name}")
+    else:
+        shared = SharedTopOfBook.attach(top_of_book)
+        result_signal(f"Attached to the top of book block {top_of_book}")
+    try:
+        missing = len(set(evaluator.symbols) - set(shared.symbols))
+        if missing:
+            result_signal(f"{missing} pairs are not in the shared top of book, they keep their snapshot")
+        result_signal(f"Streaming top of book for {len(evaluator.symbols) - missing} pairs...")
+        # Only the best level is shared, so the depth walk sees a one-level book
+        evaluator.max_book_age = None
+        shown = dict(evaluator.opportunities)  # triangle id -> last trade sent, seeded with the initial scan
+        seen = np.zeros(len(shared.symbols), dtype=np.int64)  # Row sequences already applied
+        while running():
+            await asyncio.sleep(poll_interval)
+            if feed is not None and not feed.is_alive():
+                raise RuntimeError(f"The top of book feed for {exchange_id} stopped (see the log)")
+            sequences = shared.sequences.copy()
+            rows = shared.read_all()
+            if rows is None:
+                continue  # Rows torn on every retry, read them on the next poll
+            changed = np.flatnonzero(sequences != seen)
+            if not len(changed):
+                continue
+            seen = sequences
+            order_books = {shared.symbols[idx]: row_order_book(shared.symbols[idx], rows[idx]) for idx in changed.tolist()}
+            triangle_ids = await _resolve(evaluator.apply_book_updates(
+                {symbol: order_book for symbol, order_book in order_books.items() if order_book is not None}
+            ))
+            emit_repriced(evaluator, triangle_ids, shown, datetime.now(), trade_signal, removed_signal)
+    finally:
+        if feed is not None:
+            # Joins the feed process, off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, feed.stop)
+        else:
+            shared.close()
+
+
+def emit_repriced(evaluator, triangle_ids, shown, updated_at, trade_signal, removed_signal):
+    """
+    Send the re-priced triangles that are profitable, and a removal for the ones that were
+    sent before and no longer are.
+    Args:
+        shown (dict): triangle id -> last trade sent, updated in place.
+    """
+    for triangle_id in triangle_ids.tolist():
+        trade = evaluator.opportunities.get(triangle_id)
+        if trade is not None:
+            shown[triangle_id] = trade
+            trade_signal(trade, updated_at)
+        elif triangle_id in shown:
+            trade = shown.pop(triangle_id)
+            if removed_signal:
+                removed_signal(trade, updated_at)
+
+
+async def _resolve(result):
+    """Await the coroutine returned by a ShardedScanner call, pass a TriangleEvaluator result through."""
+    return await result if inspect.isawaitable(result) else result
+
+
+def format_profitable_trade(trade, updated_at):
+    """Format a profitable trade record for the console."""
+    return (
+        f"Profitable Triangle: {trade['triangle']}\n"
+        f"Path: {' -> '.join(trade['path'])}\n"
+        f"Profit: {trade['profit']:.6f} {trade['path'][0]}\n"
+        f"Details: {trade['details']}\n"
+        f"Updated at: {updated_at:%H:%M:%S.%f}\n"
+    )
+
+async def initialize_exchange(exchange, result_signal):
+    """Initialize the exchange."""
+    print("initialize_exchange")
+    result_signal("Initializing Exchange and fetching Market Data.......")
+    await load_markets(exchange)
+    
+def get_exchange(exchange_id, exchange_config, result_signal):
+    print("get_exchange")
+    
+    result_signal(f"Loading Exchange : {exchange_id}")
+    exchange = borrow_exchange(exchange_id, exchange_config)
+    return exchange
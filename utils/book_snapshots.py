@@ -0,0 +1,86 @@
+import asyncio
+import logging
+
+from utils.rate_limiter import get_rate_limiter
+
+BULK_CHUNK_SIZE = 100  # Symbols per bulk request, keeps query strings within exchange limits
+
+
+def _ticker_to_book(ticker):
+    """
+    Turn a ticker into a one-level order book.
+    Returns:
+        dict: ccxt-shaped order book, or None when the ticker lacks the best bid/ask sizes.
+    """
+    if not ticker:
+        return None
+    bid, ask = ticker.get('bid'), ticker.get('ask')
+    bid_volume, ask_volume = ticker.get('bidVolume'), ticker.get('askVolume')
+    if not (bid and ask and bid_volume and ask_volume):
+        return None
+    return {
+        'symbol': ticker.get('symbol'),
+        'bids': [[bid, bid_volume]],
+        'asks': [[ask, ask_volume]],
+        'timestamp': ticker.get('timestamp'),
+        'datetime': ticker.get('datetime'),
+        'nonce': None,
+    }
+
+
+async def _fetch_bulk(exchange, method, symbols, chunk_size):
+    """Call a bulk endpoint over chunks of symbols and merge the results."""
+    limiter = get_rate_limiter(exchange)
+    results = {}
+    for start in range(0, len(symbols), chunk_size):
+        chunk = symbols[start:start + chunk_size]
+        await limiter.acquire(method)
+        results.update(await getattr(exchange, method)(chunk) or {})
+    return results
+
+
+async def fetch_order_book_snapshots(exchange, symbols, fetch_one, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Fetch the order books of many symbols with as few requests as the exchange allows.
+    Uses `fetchOrderBooks` (full depth) when supported, otherwise `fetchBidsAsks` or
+    `fetchTickers` (best level only), and falls back to `fetch_one` for every symbol the
+    bulk endpoints did not cover.
+    Args:
+        exchange: The ccxt exchange instance.
+        symbols (list): Symbols to fetch.
+        fetch_one (callable): Coroutine function returning (symbol, order_book) for one symbol.
+        chunk_size (int): Symbols per bulk request.
+    Returns:
+        dict: symbol -> order book, symbols that could not be fetched are left out.
+    """
+    symbols = list(symbols)
+    order_books = {}
+    bulk_methods = (
+        ('fetchOrderBooks', 'fetch_order_books', None),
+        ('fetchBidsAsks', 'fetch_bids_asks', _ticker_to_book),
+        ('fetchTickers', 'fetch_tickers', _ticker_to_book),
+    )
+    for capability, method, convert in bulk_methods:
+        missing = [symbol for symbol in symbols if symbol not in order_books]
+        if not missing:
+            break
+        if not exchange.has.get(capability):
+            continue
+        try:
+            results = await _fetch_bulk(exchange, method, missing, chunk_size)
+        except Exception as e:
+            logging.error(f"Bulk {method} failed on {exchange.id}: {e}")
+            continue
+        for symbol in missing:
+            book = results.get(symbol)
+            book = convert(book) if convert else book
+            if book and book.get('bids') and book.get('asks'):
+                order_books[symbol] = book
+
+    # Per-symbol requests for whatever the bulk endpoints did not return
+    missing = [symbol for symbol in symbols if symbol not in order_books]
+    if missing:
+        for symbol, book in await asyncio.gather(*(fetch_one(symbol) for symbol in missing)):
+            if book is not None:
+                order_books[symbol] = book
+    return order_books
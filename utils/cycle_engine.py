@@ -0,0 +1,168 @@
+import numpy as np
+
+from utils.fill_simulator import BUY, SELL
+from utils.triangle_evaluator import SIDE_NAMES
+
+
+class CycleEngine:
+    """
+    Market graph stored as edge arrays for N-leg arbitrage detection.
+
+    Every symbol gives two directed edges between coin ids: base -> quote (SELL at the bid)
+    and quote -> base (BUY at the ask). An edge weighs -log(rate * (1 - fee)), so a route
+    is profitable exactly when the weights along its cycle sum to a negative number.
+
+    `find_cycles` runs a hop-limited Bellman-Ford from the start coin: relaxation k holds
+    the lightest k-edge walk to every coin, and every edge closing back on the start coin
+    at step k yields a k-leg cycle candidate. Only the lightest k-edge walk to each coin is
+    kept, so a search reports at most one cycle per closing edge and length (the one
+    through that lightest walk, dropped if it revisits a coin), not every profitable
+    simple cycle. Each relaxation is a handful of vectorized passes over the edge arrays,
+    so re-running after `set_prices` changed a few weights costs O(max_length * edges)
+    without rebuilding anything.
+    """
+
+    def __init__(self, markets, fee=0.001):
+        """
+        Args:
+            markets (list): (symbol, base, quote) of every tradable market.
+            fee (float): Taker fee applied on each leg.
+        """
+        self.fee = fee
+        self.symbols = []
+        self.symbol_index = {}
+        self.coins = []
+        self.coin_index = {}
+        src, dst, edge_symbols, edge_sides = [], [], [], []
+        for symbol, base, quote in markets:
+            if symbol in self.symbol_index or base == quote:
+                continue
+            symbol_id = len(self.symbols)
+            self.symbol_index[symbol] = symbol_id
+            self.symbols.append(symbol)
+            base_id = self.coin_index.setdefault(base, len(self.coin_index))
+            quote_id = self.coin_index.setdefault(quote, len(self.coin_index))
+            src += [base_id, quote_id]
+            dst += [quote_id, base_id]
+            edge_symbols += [symbol_id, symbol_id]
+            edge_sides += [SELL, BUY]
+        self.coins = list(self.coin_index)
+
+        # Edges sorted by destination, so per-coin minimums are one reduceat
+        order = np.argsort(np.array(dst, dtype=np.intp), kind='stable')
+        self.src = np.array(src, dtype=np.intp)[order]
+        self.dst = np.array(dst, dtype=np.intp)[order]
+        self.edge_symbols = np.array(edge_symbols, dtype=np.intp)[order]
+        self.edge_sides = np.array(edge_sides, dtype=np.int8)[order]
+        self.dst_coins, self.dst_offsets = np.unique(self.dst, return_index=True)
+        self.weights = np.full(len(self.src), np.inf)  # Unpriced edges are unusable
+
+        # Edge of each symbol per side
+        self.sell_edges = np.empty(len(self.symbols), dtype=np.intp)
+        self.buy_edges = np.empty(len(self.symbols), dtype=np.intp)
+        sell = self.edge_sides == SELL
+        self.sell_edges[self.edge_symbols[sell]] = np.flatnonzero(sell)
+        self.buy_edges[self.edge_symbols[~sell]] = np.flatnonzero(~sell)
+
+    def set_prices(self, symbol_ids, bids, asks):
+        """
+        Update the edge weights of some symbols from their best bid and ask.
+        Args:
+            symbol_ids (np.ndarray): Engine symbol ids.
+            bids (np.ndarray): Best bid of each symbol (NaN when missing).
+            asks (np.ndarray): Best ask of each symbol (NaN when missing).
+        """
+        bids = np.asarray(bids, dtype=float)
+        asks = np.asarray(asks, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sell_weight = -np.log(bids * (1 - self.fee))
+            buy_weight = -np.log((1 - self.fee) / asks)
+        self.weights[self.sell_edges[symbol_ids]] = np.where(bids > 0, sell_weight, np.inf)
+        self.weights[self.buy_edges[symbol_ids]] = np.where(asks > 0, buy_weight, np.inf)
+
+    def update_order_books(self, order_book_dict):
+        """Update the edge weights from a {symbol: ccxt order book} mapping."""
+        symbol_ids, bids, asks = [], [], []
+        for symbol, order_book in order_book_dict.items():
+            symbol_id = self.symbol_index.get(symbol)
+            if symbol_id is None:
+                continue
+            symbol_ids.append(symbol_id)
+            order_book = order_book or {}
+            bids.append(order_book['bids'][0][0] if order_book.get('bids') else np.nan)
+            asks.append(order_book['asks'][0][0] if order_book.get('asks') else np.nan)
+        if symbol_ids:
+            self.set_prices(np.array(symbol_ids, dtype=np.intp), bids, asks)
+
+    def find_cycles(self, start_coin, max_length=5, min_length=3, limit=None):
+        """
+        Find profitable cycles of min_length to max_length legs through a start coin,
+        at most one per closing edge and length.
+        Args:
+            start_coin (str): Coin every cycle starts and ends with.
+            max_length (int): Maximum number of legs.
+            min_length (int): Minimum number of legs.
+            limit (int): Maximum number of cycles returned.
+        Returns:
+            list: Cycles as {"path", "profit", "rate", "legs": [{symbol, side}]}, best profit first.
+        """
+        start = self.coin_index.get(start_coin)
+        if start is None:
+            return []
+        n_coins = len(self.coins)
+        into_start = np.flatnonzero(self.dst == start)
+        dist = np.full(n_coins, np.inf)
+        dist[start] = 0.0
+        predecessors = []  # predecessors[k - 1][coin]: last edge of the best k-edge walk to coin
+        cycles = {}
+
+        for length in range(1, max_length + 1):
+            candidates = dist[self.src] + self.weights
+            if length >= min_length:
+                for edge in into_start[candidates[into_start] < 0].tolist():
+                    edges = self._walk_back(predecessors, edge, length)
+                    if edges is not None:
+                        cycles[tuple(edges)] = float(candidates[edge])
+            if length == max_length:
+                break
+
+            # Relaxation: lightest walk with one more edge to every coin
+            dist = np.full(n_coins, np.inf)
+            dist[self.dst_coins] = np.minimum.reduceat(candidates, self.dst_offsets)
+            best = np.flatnonzero(candidates <= dist[self.dst])
+            reached, first = np.unique(self.dst[best], return_index=True)
+            predecessor = np.full(n_coins, -1, dtype=np.intp)
+            predecessor[reached] = best[first]
+            predecessors.append(predecessor)
+            dist[start] = np.inf  # Walks only come back to the start coin to close a cycle
+
+        ranked = sorted(cycles.items(), key=lambda item: item[1])
+        return [self._cycle_record(edges, weight) for edges, weight in ranked[:limit]]
+
+    def _walk_back(self, predecessors, closing_edge, length):
+        """Rebuild the edges of a cycle, or None when the walk visits a coin twice."""
+        edges = [closing_edge]
+        coin = self.src[closing_edge]
+        for step in range(length - 1, 0, -1):
+            edge = predecessors[step - 1][coin]
+            if edge < 0:
+                return None
+            edges.append(edge)
+            coin = self.src[edge]
+        edges.reverse()
+        visited = [self.src[edge] for edge in edges]
+        if len(set(visited)) != len(visited):
+            return None
+        return [int(edge) for edge in edges]
+
+    def _cycle_record(self, edges, weight):
+        rate = float(np.exp(-weight))
+        return {
+            "path": [self.coins[self.src[edges[0]]]] + [self.coins[self.dst[edge]] for edge in edges],
+            "profit": rate - 1,
+            "rate": rate,
+            "legs": [
+                {"symbol": self.symbols[self.edge_symbols[edge]], "side": SIDE_NAMES[self.edge_sides[edge]]}
+                for edge in edges
+            ]
+        }
@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from utils.utils import create_blank_db
+
+DB_PATH = "data/crypto_boy.sqlite"
+
+
+class Database:
+    """
+    Single long-lived SQLite connection shared by the whole process.
+
+    The connection runs in WAL mode (readers never wait for the writer) and keeps its
+    prepared statements in sqlite3's statement cache, so a query string runs without
+    being re-parsed. Reads flagged `cached=True` are answered from an in-memory cache
+    that every write clears, which suits the small config tables read on each UI action.
+    A lock serializes access, so worker threads may share the connection.
+    """
+
+    def __init__(self, path=DB_PATH, statement_cache_size=128):
+        """
+        Args:
+            path (str): Database file, created with the default schema when missing.
+            statement_cache_size (int): Prepared statements kept by the connection.
+        """
+        self.path = path
+        self.statement_cache_size = statement_cache_size
+        self._connection = None
+        self._lock = threading.RLock()
+        self._cache = {}  # (sql, params) -> rows
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            if not os.path.exists(self.path):
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                create_blank_db(sqlite3.connect(self.path))  # Closes its connection when done
+            connection = sqlite3.connect(
+                self.path,
+                check_same_thread=False,
+                cached_statements=self.statement_cache_size
+            )
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")  # Durable enough in WAL mode, far fewer fsyncs
+            connection.execute("PRAGMA foreign_keys = ON")
+            connection.execute("PRAGMA busy_timeout = 5000")
+            self._connection = connection
+        return self._connection
+
+    def fetchall(self, sql, params=(), cached=False):
+        """
+        Returns:
+            list: Rows of a query, from the cache when `cached` and nothing was written since.
+        """
+        key = (sql, tuple(params))
+        with self._lock:
+            if cached and key in self._cache:
+                return list(self._cache[key])
+            rows = self.connection.execute(sql, params).fetchall()
+            if cached:
+                self._cache[key] = tuple(rows)
+            return rows
+
+    def fetchone(self, sql, params=(), cached=False):
+        """
+        Returns:
+            tuple: First row of a query, or None.
+        """
+        rows = self.fetchall(sql, params, cached)
+        return rows[0] if rows else None
+
+    @contextmanager
+    def transaction(self):
+        """Yield the connection for several writes, committed together (rolled back on error)."""
+        with self._lock:
+            try:
+                yield self.connection
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            finally:
+                self._cache.clear()
+
+    def execute(self, sql, params=()):
+        """
+        Run a single write and commit it.
+        Returns:
+            sqlite3.Cursor: The cursor (lastrowid, rowcount).
+        """
+        with self.transaction() as connection:
+            return connection.execute(sql, params)
+
+    def invalidate(self):
+        """Drop the cached reads (after an external change to the file)."""
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        with self._lock:
+            self._cache.clear()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    """Return the process-wide `Database`, opened on first use."""
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = Database()
+        return _database
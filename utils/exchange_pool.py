@@ -0,0 +1,57 @@
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+
+import ccxt.pro as ccxtpro
+
+# Long-lived ccxt sessions shared by every worker and UI action.
+# ccxt binds its HTTP and websocket sessions to the event loop they were opened in,
+# so a session is only reused by callers running on the same loop.
+_sessions = {}  # (loop, exchange_id, config hash) -> ccxt exchange
+_sessions_lock = threading.Lock()
+
+
+def _current_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _config_key(exchange_config):
+    """Hash the exchange config so credentials are not kept in plain text in the pool keys."""
+    return hashlib.sha256(json.dumps(exchange_config or {}, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def borrow_exchange(exchange_id, exchange_config=None):
+    """
+    Return the pooled exchange session for an exchange id and config, creating it on first use.
+    Borrowers must not close it: the session stays warm for the next caller.
+    Args:
+        exchange_id (str): ccxt exchange id.
+        exchange_config (dict): ccxt config (credentials, options...).
+    Returns:
+        The shared ccxt.pro exchange instance.
+    """
+    key = (_current_loop(), exchange_id, _config_key(exchange_config))
+    with _sessions_lock:
+        exchange = _sessions.get(key)
+        if exchange is None:
+            exchange = getattr(ccxtpro, exchange_id)(dict(exchange_config or {}))
+            _sessions[key] = exchange
+    return exchange
+
+
+async def close_exchanges():
+    """Close every pooled session opened on the running event loop (call before the loop ends)."""
+    loop = _current_loop()
+    with _sessions_lock:
+        keys = [key for key in _sessions if key[0] is loop]
+        exchanges = [_sessions.pop(key) for key in keys]
+    for exchange in exchanges:
+        try:
+            await exchange.close()
+        except Exception as e:
+            logging.error(f"Error closing {exchange.id} session: {e}")
@@ -0,0 +1,92 @@
+import numpy as np
+
+# Leg sides: BUY spends the quote currency at the asks, SELL spends the base currency at the bids
+BUY, SELL = 0, 1
+
+
+def walk_book(price, amount, is_buy, amount_in):
+    """
+    Consume book levels for many legs at once.
+    Args:
+        price (np.ndarray): (n, depth) level prices of the side each leg trades against.
+        amount (np.ndarray): (n, depth) level amounts, in base currency.
+        is_buy (np.ndarray): (n,) True when the leg spends quote currency at the asks.
+        amount_in (np.ndarray): (n,) amount spent on the leg (quote when buying, base when selling).
+    Returns:
+        tuple: (amount_out, filled) where filled is False when the book is too thin for amount_in.
+    """
+    is_buy = is_buy[:, None]
+    # What each level can absorb, expressed in the currency being spent
+    capacity = np.nan_to_num(np.where(is_buy, price * amount, amount))
+    consumed = np.clip(amount_in[:, None] - (np.cumsum(capacity, axis=1) - capacity), 0, capacity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        received = np.where(is_buy, consumed / price, consumed * price)
+    amount_out = np.where(consumed > 0, received, 0).sum(axis=1)
+    filled = amount_in <= capacity.sum(axis=1) * (1 + 1e-12)
+    return amount_out, filled
+
+
+def simulate_fills(book, legs, sides, start_amount, fees):
+    """
+    Walk a start amount through the three legs of many triangles.
+    Args:
+        book (OrderBookStore): Depth of every symbol.
+        legs (np.ndarray): (n, 3) symbol indexes of the legs.
+        sides (np.ndarray): (n, 3) BUY/SELL side of each leg.
+        start_amount (np.ndarray): (n,) amount of the starting currency.
+        fees (float): Taker fee applied on each leg.
+    Returns:
+        tuple: (end_amount, filled) per triangle.
+    """
+    amount = np.asarray(start_amount, dtype=float)
+    filled = np.ones(len(legs), dtype=bool)
+    for leg in range(3):
+        symbol_ids = legs[:, leg]
+        is_buy = sides[:, leg] == BUY
+        price = np.where(is_buy[:, None], book.ask_price[symbol_ids], book.bid_price[symbol_ids])
+        level_amount = np.where(is_buy[:, None], book.ask_amount[symbol_ids], book.bid_amount[symbol_ids])
+        amount, leg_filled = walk_book(price, level_amount, is_buy, amount)
+        amount = amount * (1 - fees)
+        filled &= leg_filled
+    return amount, filled
+
+
+def max_profitable_size(book, legs, sides, fees, iterations=40):
+    """
+    Largest start amount that still fills completely and ends with more than it started.
+    Because walking deeper only worsens the average price, profitability is monotonic
+    in size and a vectorized bisection finds the limit for every triangle at once.
+    Args:
+        book (OrderBookStore): Depth of every symbol.
+        legs (np.ndarray): (n, 3) symbol indexes of the legs.
+        sides (np.ndarray): (n, 3) BUY/SELL side of each leg.
+        fees (float): Taker fee applied on each leg.
+        iterations (int): Bisection steps.
+    Returns:
+        np.ndarray: (n,) maximum profitable size, 0 when not even the best level is profitable.
+    """
+    # Upper bound: everything the first leg's book can absorb
+    first = legs[:, 0]
+    is_buy = sides[:, 0] == BUY
+    high = np.where(
+        is_buy,
+        np.nansum(book.ask_price[first] * book.ask_amount[first], axis=1),
+        book.bid_amount[first].sum(axis=1)
+    )
+
+    def profitable(size):
+        end_amount, filled = simulate_fills(book, legs, sides, size, fees)
+        return filled & (end_amount > size) & (size > 0)
+
+    low = np.zeros(len(legs))
+    best = np.where(profitable(high), high, 0.0)
+    searching = best == 0
+    for _ in range(iterations):
+        if not searching.any():
+            break
+        mid = (low + high) / 2
+        ok = profitable(mid)
+        low = np.where(searching & ok, mid, low)
+        high = np.where(searching & ~ok, mid, high)
+    return np.where(searching, low, best)
+
@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import logging
+import threading
+
+from utils.rate_limiter import get_rate_limiter
+
+# Market metadata shared by every worker and UI action, in memory and on disk
+MARKET_CACHE_DIR = "data/markets"
+MARKET_CACHE_TTL = 6 * 60 * 60  # Listings change rarely, refresh every 6 hours
+
+_memory_cache = {}  # cache key -> (fetched_at, markets, currencies)
+_memory_lock = threading.Lock()  # Workers run their own event loops in separate threads
+
+
+def _cache_key(exchange):
+    """Markets of the sandbox differ from production, keep them apart."""
+    if getattr(exchange, 'isSandboxModeEnabled', False):
+        return f"{exchange.id}-sandbox"
+    return exchange.id
+
+
+def _cache_path(cache_key):
+    return os.path.join(MARKET_CACHE_DIR, f"{cache_key}.json")
+
+
+def get_cached_markets(cache_key, ttl=MARKET_CACHE_TTL):
+    """
+    Return the cached market metadata of an exchange if it is fresh enough.
+    Args:
+        cache_key (str): Exchange id (suffixed with '-sandbox' for sandbox markets).
+        ttl (float): Maximum age of the cached markets (in seconds).
+    Returns:
+        tuple: (markets, currencies) or None when missing or expired.
+    """
+    now = time.time()
+    with _memory_lock:
+        entry = _memory_cache.get(cache_key)
+    if entry is None:
+        try:
+            with open(_cache_path(cache_key), encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+            entry = (data['fetched_at'], data['markets'], data.get('currencies'))
+        except (OSError, ValueError, KeyError):
+            return None
+        with _memory_lock:
+            _memory_cache[cache_key] = entry
+    fetched_at, markets, currencies = entry
+    if now - fetched_at > ttl:
+        return None
+    return markets, currencies
+
+
+def store_markets(cache_key, markets, currencies):
+    """Save market metadata in memory and on disk."""
+    fetched_at = time.time()
+    with _memory_lock:
+        _memory_cache[cache_key] = (fetched_at, markets, currencies)
+    try:
+        os.makedirs(MARKET_CACHE_DIR, exist_ok=True)
+        tmp_path = _cache_path(cache_key) + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump({'fetched_at': fetched_at, 'markets': markets, 'currencies': currencies}, cache_file, default=str)
+        os.replace(tmp_path, _cache_path(cache_key))
+    except OSError as e:
+        logging.error(f"Failed to write the market cache for {cache_key}: {e}")
+
+
+async def load_markets(exchange, ttl=MARKET_CACHE_TTL, reload=False):
+    """
+    Drop-in replacement for `exchange.load_markets()` backed by the shared market cache.
+    Args:
+        exchange: The ccxt exchange instance.
+        ttl (float): Maximum age of the cached markets (in seconds).
+        reload (bool): Force a download from the exchange.
+    Returns:
+        dict: The exchange markets.
+    """
+    cache_key = _cache_key(exchange)
+    cached = None if reload else get_cached_markets(cache_key, ttl)
+    if cached is not None:
+        markets, currencies = cached
+        return exchange.set_markets(markets, currencies)
+
+    await get_rate_limiter(exchange).acquire('load_markets')
+    markets = await exchange.load_markets(reload)
+    store_markets(cache_key, exchange.markets, exchange.currencies)
+    return markets
@@ -0,0 +1,80 @@
+import numpy as np
+
+from utils.fill_simulator import BUY, SELL
+
+
+class MarketGraph:
+    """
+    Coin graph of an exchange in compressed sparse row form.
+
+    Coins are interned to integer ids. The neighbours of coin c are
+    `indices[indptr[c]:indptr[c + 1]]` (sorted), and `edge_symbols` / `edge_directions`
+    give for each edge the symbol traded and whether it SELLs the base (base -> quote)
+    or BUYs it (quote -> base). Parallel markets between the same two coins keep the
+    first symbol, like the dict-of-sets graph did.
+    """
+
+    def __init__(self, markets):
+        """
+        Args:
+            markets (list): (symbol, base, quote) of every tradable market.
+        """
+        self.coin_index = {}
+        self.symbols = []
+        src, dst, edge_symbols, edge_directions = [], [], [], []
+        for symbol, base, quote in markets:
+            if base == quote:
+                continue
+            base_id = self.coin_index.setdefault(base, len(self.coin_index))
+            quote_id = self.coin_index.setdefault(quote, len(self.coin_index))
+            symbol_id = len(self.symbols)
+            self.symbols.append(symbol)
+            src += [base_id, quote_id]
+            dst += [quote_id, base_id]
+            edge_symbols += [symbol_id, symbol_id]
+            edge_directions += [SELL, BUY]
+        self.coins = list(self.coin_index)
+        n_coins = len(self.coins)
+
+        src = np.array(src, dtype=np.int32)
+        dst = np.array(dst, dtype=np.int32)
+        # Sort by (src, dst) and drop parallel edges, keeping the first market listed
+        keys = src.astype(np.int64) * n_coins + dst
+        self.edge_keys, first = np.unique(keys, return_index=True)
+        self.indices = dst[first]
+        self.edge_symbols = np.array(edge_symbols, dtype=np.int32)[first]
+        self.edge_directions = np.array(edge_directions, dtype=np.int8)[first]
+        self.indptr = np.zeros(n_coins + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src[first], minlength=n_coins), out=self.indptr[1:])
+
+    def __len__(self):
+        return len(self.coins)
+
+    def neighbors(self, coin_id):
+        """Sorted ids of the coins tradable against a coin."""
+        return self.indices[self.indptr[coin_id]:self.indptr[coin_id + 1]]
+
+    def has_edges(self, src, dst):
+        """Vectorized membership test of (src, dst) coin id pairs."""
+        keys = np.asarray(src, dtype=np.int64) * len(self.coins) + dst
+        positions = np.searchsorted(self.edge_keys, keys)
+        found = positions < len(self.edge_keys)
+        found[found] = self.edge_keys[positions[found]] == keys[found]
+        return found
+
+    def triangles(self, start_id):
+        """
+        Enumerate the 3-coin cycles through a start coin.
+        Returns:
+            np.ndarray: (n, 3) coin ids [start, intermediate, final] of every cycle.
+        """
+        first_level = self.neighbors(start_id)
+        counts = self.indptr[first_level + 1] - self.indptr[first_level]
+        if not counts.sum():
+            return np.empty((0, 3), dtype=np.int32)
+        # Flatten the neighbour lists of every intermediate coin
+        intermediate = np.repeat(first_level, counts)
+        row_starts = np.repeat(self.indptr[first_level] - (np.cumsum(counts) - counts), counts)
+        final = self.indices[row_starts + np.arange(counts.sum())]
+        closes = (final != start_id) & self.has_edges(final, np.full(len(final), start_id))
+        return np.column_stack([np.full(closes.sum(), start_id), intermediate[closes], final[closes]])
@@ -0,0 +1,102 @@
+import time
+import threading
+from collections import OrderedDict
+
+DEFAULT_BOOK_TTL = 2.0  # Seconds a REST snapshot is considered fresh enough to reuse
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+# Rough footprint of a ccxt book: one [price, amount] list per level plus the dict around it
+LEVEL_BYTES = 128
+BOOK_OVERHEAD_BYTES = 512
+
+
+def _book_size(order_book):
+    levels = len(order_book.get('bids') or []) + len(order_book.get('asks') or [])
+    return BOOK_OVERHEAD_BYTES + levels * LEVEL_BYTES
+
+
+class OrderBookCache:
+    """
+    Order books keyed by (exchange id, symbol, depth) with a freshness budget per entry
+    and least-recently-used eviction once the estimated memory use exceeds `max_bytes`.
+    Counts hits, misses and stale lookups so the cache can be tuned.
+    """
+
+    def __init__(self, ttl=DEFAULT_BOOK_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            ttl (float): Default freshness budget of an entry (in seconds).
+            max_bytes (int): Estimated memory cap of the cached books.
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (stored_at, ttl, order_book, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, exchange_id, symbol, depth=None, max_age=None):
+        """
+        Return a cached book if it is still within its freshness budget.
+        Args:
+            exchange_id (str): ccxt exchange id.
+            symbol (str): The trading pair (e.g., 'BTC/USDT').
+            depth (int): Requested number of levels (None for the exchange default).
+            max_age (float): Stricter age limit for this lookup (in seconds).
+        Returns:
+            dict: The order book, or None on a miss or when the entry is stale.
+        """
+        key = (exchange_id, symbol, depth)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, ttl, order_book, size = entry
+            age = time.time() - stored_at
+            if age > ttl or (max_age is not None and age > max_age):
+                self.stale += 1
+                if age > ttl:
+                    del self.entries[key]
+                    self.size -= size
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return order_book
+
+    def put(self, exchange_id, symbol, order_book, depth=None, ttl=None):
+        """Store a book, stamping it with the receive time when the exchange gave no timestamp."""
+        if order_book is None:
+            return
+        stored_at = time.time()
+        if order_book.get('timestamp') is None:
+            order_book['timestamp'] = int(stored_at * 1000)
+        key = (exchange_id, symbol, depth)
+        size = _book_size(order_book)
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[3]
+            self.entries[key] = (stored_at, self.ttl if ttl is None else ttl, order_book, size)
+            self.size += size
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted[3]
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Entry count, estimated size and hit/miss/stale/eviction counters.
+        """
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,180 @@
+import time
+import asyncio
+import logging
+
+import numpy as np
+import ccxt.pro as ccxtpro
+
+from utils.order_book_store import DEFAULT_DEPTH, OrderBookStore
+from utils.rate_limiter import get_rate_limiter
+
+
+class OrderBookManager:
+    """
+    Live local L2 books for a set of symbols.
+
+    Each symbol is subscribed once and kept in an `OrderBookStore`. ccxt.pro applies the
+    websocket diffs to its own book; every update is checked for sequence gaps (the
+    book nonce must not go backwards), crossed books and checksum/nonce errors raised by
+    ccxt, and the symbol is resynced from a REST snapshot when one is found.
+    Consumers read the best bid/ask in O(1) and a bounded depth view of the arrays.
+    """
+
+    def __init__(self, exchange, depth=DEFAULT_DEPTH, on_update=None, retry_delay=1):
+        """
+        Args:
+            exchange: The ccxt.pro exchange instance.
+            depth (int): Levels kept per side.
+            on_update (callable): Called with the symbol after each applied update.
+            retry_delay (float): Delay before re-subscribing after an error (in seconds).
+        """
+        self.exchange = exchange
+        self.on_update = on_update
+        self.retry_delay = retry_delay
+        self.store = OrderBookStore([], depth)
+        self.nonces = {}  # symbol -> nonce of the last applied book
+        self.updated_at = {}  # symbol -> time of the last applied book
+        self.failed = set()  # Symbols the exchange rejected
+        self.resyncs = 0
+        self._ready = {}  # symbol -> asyncio.Event set once a first book (or a failure) arrived
+        self._tasks = {}  # symbol -> watch task
+
+    async def subscribe(self, symbols):
+        """Start one watch task for every symbol that is not subscribed yet."""
+        new_symbols = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self._tasks]
+        self.store.add_symbols(new_symbols)  # Grow the blocks once for the whole batch
+        for symbol in new_symbols:
+            self._ready[symbol] = asyncio.Event()
+            self._tasks[symbol] = asyncio.create_task(self._watch(symbol))
+
+    async def wait_ready(self, symbols, timeout=None):
+        """Wait until every symbol received its first book or its first failed attempt."""
+        waiters = [self._ready[symbol].wait() for symbol in dict.fromkeys(symbols) if symbol in self._ready]
+        try:
+            await asyncio.wait_for(asyncio.gather(*waiters), timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"Timed out waiting for the first order books on {self.exchange.id}")
+
+    async def _watch(self, symbol):
+        while True:
+            try:
+                order_book = await self.exchange.watch_order_book(symbol)
+            except asyncio.CancelledError:
+                raise
+            except ccxtpro.BadSymbol as e:
+                logging.error(f"{symbol} is not available on {self.exchange.id}: {e}")
+                self.failed.add(symbol)
+                self.store.update(symbol, None)
+                self._ready[symbol].set()
+                return
+            except ccxtpro.InvalidNonce as e:
+                # ccxt found a gap or a checksum mismatch while applying a diff
+                logging.error(f"Order book of {symbol} out of sync: {e}")
+                await self._resync(symbol)
+                continue
+            except Exception as e:
+                logging.error(f"Error watching order book for {symbol}: {e}")
+                # Don't hold wait_ready on a failing symbol, keep retrying in the background
+                self._ready[symbol].set()
+                await asyncio.sleep(self.retry_delay)
+                continue
+
+            if not self._in_sequence(symbol, order_book):
+                await self._resync(symbol)
+                continue
+            self._apply(symbol, order_book)
+
+    def _in_sequence(self, symbol, order_book):
+        """Reject updates whose nonce went backwards and books whose best bid crosses the best ask."""
+        nonce, last_nonce = order_book.get('nonce'), self.nonces.get(symbol)
+        if nonce is not None and last_nonce is not None and nonce < last_nonce:
+            logging.error(f"Sequence gap on {symbol}: nonce {nonce} after {last_nonce}")
+            return False
+        bids, asks = order_book.get('bids'), order_book.get('asks')
+        if bids and asks and bids[0][0] >= asks[0][0]:
+            logging.error(f"Crossed order book on {symbol}: bid {bids[0][0]} >= ask {asks[0][0]}")
+            return False
+        return True
+
+    async def _resync(self, symbol):
+        """
+        Replace the local book with a REST snapshot, and drop ccxt's streamed copy so the
+        next watch starts again from a fresh snapshot instead of the gapped book.
+        """
+        self.resyncs += 1
+        await self._reset_stream_book(symbol)
+        try:
+            await get_rate_limiter(self.exchange).acquire('fetch_order_book', self.store.depth)
+            snapshot = await self.exchange.fetch_order_book(symbol, self.store.depth)
+        except Exception as e:
+            logging.error(f"Failed to resync order book for {symbol}: {e}")
+            self._ready[symbol].set()
+            await asyncio.sleep(self.retry_delay)
+            return
+        self._apply(symbol, snapshot)
+        self.nonces.pop(symbol, None)  # Sequence checks restart from the next streamed book
+
+    async def _reset_stream_book(self, symbol):
+        if self.exchange.has.get('unWatchOrderBook'):
+            try:
+                await self.exchange.un_watch_order_book(symbol)  # Re-subscribed by the next watch
+            except Exception as e:
+                logging.error(f"Failed to unsubscribe the order book of {symbol}: {e}")
+        orderbooks = getattr(self.exchange, 'orderbooks', None)
+        if orderbooks is not None:
+            orderbooks.pop(symbol, None)
+
+    def _apply(self, symbol, order_book):
+        if order_book.get('nonce') is not None:
+            self.nonces[symbol] = order_book['nonce']
+        self.updated_at[symbol] = time.time()
+        changed = self.store.update(symbol, order_book)
+        self._ready[symbol].set()
+        if changed and self.on_update:
+            self.on_update(symbol)
+
+    def _best(self, side, symbol):
+        idx = self.store.symbol_index.get(symbol)
+        if idx is None:
+            return None
+        price, amount = side[idx, 0]
+        if np.isnan(price):
+            return None
+        return float(price), float(amount)
+
+    def best_bid(self, symbol):
+        """
+        Returns:
+            tuple: (price, amount) of the best bid, or None when there is no book.
+        """
+        return self._best(self.store.bids, symbol)
+
+    def best_ask(self, symbol):
+        """
+        Returns:
+            tuple: (price, amount) of the best ask, or None when there is no book.
+        """
+        return self._best(self.store.asks, symbol)
+
+    def depth_view(self, symbol, levels=None):
+        """
+        Read-only view on the top levels of a symbol, without copying.
+        The view follows live updates until new symbols are subscribed (the blocks then grow).
+        Returns:
+            tuple: (bids, asks) arrays of shape (levels, 2) holding [price, amount], or None.
+        """
+        idx = self.store.symbol_index.get(symbol)
+        if idx is None:
+            return None
+        levels = self.store.depth if levels is None else min(levels, self.store.depth)
+        bids, asks = self.store.bids[idx, :levels], self.store.asks[idx, :levels]
+        bids.flags.writeable = False
+        asks.flags.writeable = False
+        return bids, asks
+
+    async def close(self):
+        """Cancel every watch task."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
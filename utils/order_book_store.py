@@ -0,0 +1,119 @@
+import numpy as np
+
+DEFAULT_DEPTH = 20
+PRICE, AMOUNT = 0, 1  # Fields of a level
+
+
+class OrderBookStore:
+    """
+    Top `depth` levels of every symbol's order book in two preallocated blocks,
+    `asks` and `bids`, of shape (n_symbols, depth, 2) holding [price, amount] per level.
+    Books are copied in place on every update, so readers (the evaluator, the fill
+    simulation) index the same contiguous memory instead of ccxt's nested lists.
+    Missing levels have a NaN price and a zero amount; the best level is level 0.
+
+    Given a `buffer` (e.g. a `multiprocessing.shared_memory` block of `nbytes(...)`), both
+    blocks live in it so other processes can map the same books; the symbol set is then fixed.
+    """
+
+    def __init__(self, symbols, depth=DEFAULT_DEPTH, buffer=None):
+        self.depth = depth
+        self.symbols = []
+        self.symbol_index = {}
+        self.buffer = buffer
+        self._scratch = np.empty((depth, 2))  # Incoming side, compared before being copied
+        if buffer is not None:
+            self.symbols = list(symbols)
+            self.symbol_index = {symbol: idx for idx, symbol in enumerate(self.symbols)}
+            blocks = np.ndarray((2, len(self.symbols), depth, 2), dtype=np.float64, buffer=buffer)
+            self.asks, self.bids = blocks[0], blocks[1]
+            self._bind_views()
+            return
+        self.asks = np.empty((0, depth, 2))
+        self.bids = np.empty((0, depth, 2))
+        self._bind_views()
+        self.add_symbols(symbols)
+
+    @staticmethod
+    def nbytes(n_symbols, depth=DEFAULT_DEPTH):
+        """Size of the buffer needed for both blocks."""
+        return 2 * n_symbols * depth * 2 * np.dtype(np.float64).itemsize
+
+    def clear(self):
+        """Mark every level as missing."""
+        for side in (self.asks, self.bids):
+            side[..., PRICE] = np.nan
+            side[..., AMOUNT] = 0.0
+
+    def _bind_views(self):
+        # Views on the blocks, no copies
+        self.ask_price = self.asks[..., PRICE]
+        self.ask_amount = self.asks[..., AMOUNT]
+        self.bid_price = self.bids[..., PRICE]
+        self.bid_amount = self.bids[..., AMOUNT]
+
+    def add_symbols(self, symbols):
+        """
+        Grow the blocks for symbols not stored yet (existing rows keep their index).
+        Returns:
+            list: Indexes of the given symbols.
+        """
+        symbols = list(symbols)
+        new_symbols = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self.symbol_index]
+        if new_symbols and self.buffer is not None:
+            raise ValueError("Cannot add symbols to an order book store backed by an external buffer")
+        if new_symbols:
+            for symbol in new_symbols:
+                self.symbol_index[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+            blank = np.empty((len(new_symbols), self.depth, 2))
+            blank[..., PRICE] = np.nan
+            blank[..., AMOUNT] = 0.0
+            self.asks = np.concatenate([self.asks, blank])
+            self.bids = np.concatenate([self.bids, blank])
+            self._bind_views()
+        return [self.symbol_index[symbol] for symbol in symbols]
+
+    def _write_side(self, side, idx, levels):
+        """Copy up to `depth` ccxt levels into one side of a symbol. Returns True if it changed."""
+        scratch = self._scratch
+        count = min(len(levels), self.depth) if levels else 0
+        if count:
+            levels = levels[:count]
+            try:
+                scratch[:count] = levels
+            except ValueError:
+                # Some exchanges add an order count or id after [price, amount]
+                scratch[:count] = [level[:2] for level in levels]
+        scratch[count:, PRICE] = np.nan
+        scratch[count:, AMOUNT] = 0.0
+        row = side[idx]
+        if np.array_equal(scratch, row, equal_nan=True):
+            return False
+        row[...] = scratch
+        return True
+
+    def update(self, symbol, order_book):
+        """
+        Copy the top levels of a ccxt order book (or clear them when it is None).
+        Args:
+            symbol (str): The trading pair (e.g., 'BTC/USDT').
+            order_book (dict): ccxt order book, or None.
+        Returns:
+            bool: True if any stored level changed.
+        """
+        idx = self.symbol_index.get(symbol)
+        if idx is None:
+            return False
+        asks = order_book.get('asks') if order_book else None
+        bids = order_book.get('bids') if order_book else None
+        asks_changed = self._write_side(self.asks, idx, asks)
+        bids_changed = self._write_side(self.bids, idx, bids)
+        return asks_changed or bids_changed
+
+    def best_levels(self, symbol_ids):
+        """
+        Returns:
+            tuple: (best ask, best bid) [price, amount] arrays of shape symbol_ids.shape + (2,).
+        """
+        return self.asks[symbol_ids, 0], self.bids[symbol_ids, 0]
@@ -0,0 +1,124 @@
+import math
+import time
+import asyncio
+import threading
+
+# Cost of the unified calls we make, in the exchange's ccxt rate-limit units
+# (one unit refills every `exchange.rateLimit` milliseconds).
+# A list of (max limit, cost) pairs prices an endpoint by the requested depth.
+# Sessions paced here are created with 'enableRateLimit': False, otherwise ccxt's own
+# throttler would pace every call a second time.
+ENDPOINT_WEIGHTS = {
+    'default': {
+        'load_markets': 1,
+        'fetch_order_book': 1,
+        'fetch_order_books': 1,
+        'fetch_ticker': 1,
+        'fetch_tickers': 1,
+        'fetch_bids_asks': 1,
+        'fetch_balance': 1,
+    },
+    'binance': {
+        'load_markets': 6,  # exchangeInfo of spot (4), linear (1) and inverse (1) markets
+        'fetch_order_book': [(100, 1), (500, 5), (1000, 10), (5000, 50)],
+        'fetch_ticker': 0.4,
+        'fetch_tickers': 16,
+        'fetch_bids_asks': 0.8,
+        'fetch_balance': 4,
+    },
+}
+
+_limiters = {}  # exchange id -> TokenBucketLimiter
+_limiters_lock = threading.Lock()
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket pacing the REST calls made to one exchange.
+    Callers reserve the cost of their request up front and sleep until the bucket
+    has refilled enough to cover it, so requests go out in arrival order at the exchange's
+    sustained rate with short bursts up to `capacity`. The state is guarded by a thread
+    lock because each worker runs its own event loop.
+    """
+
+    def __init__(self, rate, capacity=None, weights=None):
+        """
+        Args:
+            rate (float): Units refilled per second.
+            capacity (float): Burst size in units (defaults to one second of budget).
+            weights (dict): Endpoint costs, see ENDPOINT_WEIGHTS.
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.weights = {**ENDPOINT_WEIGHTS['default'], **(weights or {})}
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def cost(self, endpoint, limit=None):
+        """Cost of one call to an endpoint, picking the depth bracket when costs depend on `limit`."""
+        weight = self.weights.get(endpoint, 1)
+        if isinstance(weight, list):
+            if limit is None:
+                return weight[0][1]
+            for max_limit, bracket_cost in weight:
+                if limit <= max_limit:
+                    return bracket_cost
+            return weight[-1][1]
+        return weight
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, endpoint='default', limit=None):
+        """Reserve the cost of a request and wait until the budget allows sending it."""
+        if math.isinf(self.rate):
+            return
+        cost = self.cost(endpoint, limit)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= cost
+            delay = max(-self.tokens / self.rate, self.blocked_until - now, 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def headroom(self):
+        """
+        Returns:
+            float: Units that can be spent right now without waiting.
+        """
+        if math.isinf(self.rate):
+            return math.inf
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return 0.0
+            return max(self.tokens, 0.0)
+
+    def penalize(self, seconds):
+        """Stop sending for a while after the exchange answered with a rate-limit error."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = min(self.tokens, 0.0)
+
+
+def get_rate_limiter(exchange):
+    """
+    Return the limiter shared by every caller of an exchange, sized from ccxt's `rateLimit`.
+    Args:
+        exchange: The ccxt exchange instance.
+    Returns:
+        TokenBucketLimiter: The exchange limiter.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(exchange.id)
+        if limiter is None:
+            rate_limit = getattr(exchange, 'rateLimit', 0) or 0
+            rate = 1000 / rate_limit if rate_limit > 0 else math.inf
+            limiter = TokenBucketLimiter(rate, weights=ENDPOINT_WEIGHTS.get(exchange.id))
+            _limiters[exchange.id] = limiter
+    return limiter
@@ -0,0 +1,191 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.order_book_store import DEFAULT_DEPTH, OrderBookStore
+from utils.triangle_evaluator import CompiledTriangles, TriangleEvaluator, compile_triangles
+
+
+def _shared_timestamps(shm, n_symbols, depth):
+    """Epoch seconds of each symbol's book, stored after the books in the shared block."""
+    return np.ndarray(n_symbols, dtype=np.float64, buffer=shm.buf, offset=OrderBookStore.nbytes(n_symbols, depth))
+
+
+def _shard_worker(connection, shm_name, compiled, depth, offset):
+    """
+    Process body of one shard: prices its slice of the cycles against the shared books
+    whenever the parent asks, and answers with its current opportunities.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        book = OrderBookStore(compiled.symbols, depth, buffer=shm.buf)
+        evaluator = TriangleEvaluator(compiled, depth=depth, book=book)
+        evaluator.book_timestamps = _shared_timestamps(shm, len(compiled.symbols), depth)
+        while True:
+            command, args = connection.recv()
+            if command == 'close':
+                break
+            try:
+                # Every command carries the parent's current max_book_age
+                evaluator.max_book_age, args = args
+                if command == 'evaluate':
+                    evaluator.evaluate(*args)
+                elif command == 'reprice':
+                    evaluator.reprice(evaluator.triangles_for_symbols(args))
+                connection.send({offset + i: trade for i, trade in evaluator.opportunities.items()})
+            except Exception as e:
+                logging.error(f"Scan shard failed: {e}")
+                connection.send({})
+        # Release the views on the shared block before unmapping it
+        del evaluator, book
+    finally:
+        shm.close()
+
+
+class ShardedScanner:
+    """
+    Runs the `TriangleEvaluator` over a process pool.
+
+    The cycles are split into one contiguous shard per process. Order books (and their
+    timestamps) are written once by this process into an `OrderBookStore` living in shared
+    memory, so the shards read them without any copy or pickling; only the commands and
+    the (small) sets of profitable trades cross the process boundary. Books are only
+    written between two commands, under a lock, so the shards never read a book being written.
+
+    Exposes the scanning API of `TriangleEvaluator` (`symbols`, `opportunities`,
+    `max_book_age`, `load_order_books`, `evaluate`, `apply_book_updates`,
+    `ranked_opportunities`), except that `evaluate` and `apply_book_updates` are
+    coroutines: the shards' answers are awaited in the loop's executor, so the event loop
+    keeps serving the websockets while the shards compute. Must be closed with `close()`.
+    """
+
+    def __init__(self, triangular_pairs, processes=None, depth=DEFAULT_DEPTH, max_book_age=None):
+        """
+        Args:
+            triangular_pairs (list | CompiledTriangles): Triangles as returned by `tradable_pairs`,
+                or already compiled by `compile_triangles`.
+            processes (int): Number of shards, defaults to the number of CPU cores.
+            depth (int): Number of book levels kept per side.
+            max_book_age (float): Maximum age of a leg's book (in seconds), None to accept any age.
+        """
+        if not isinstance(triangular_pairs, CompiledTriangles):
+            triangular_pairs = compile_triangles(triangular_pairs)
+        self.compiled = triangular_pairs
+        self.triangular_pairs = self.compiled.triangular_pairs
+        self.symbols = self.compiled.symbols
+        processes = max(1, min(processes or os.cpu_count() or 1, len(self.compiled) or 1))
+
+        size = OrderBookStore.nbytes(len(self.symbols), depth) + len(self.symbols) * np.dtype(np.float64).itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.book = OrderBookStore(self.symbols, depth, buffer=self._shm.buf)
+        self.book.clear()
+        # Local evaluator over the shared books: writes books and timestamps, and maps symbols
+        # to the ids of the triangles they re-price (it never prices anything itself)
+        self._index = TriangleEvaluator(self.compiled, depth=depth, max_book_age=max_book_age, book=self.book)
+        self._index.book_timestamps = _shared_timestamps(self._shm, len(self.symbols), depth)
+        self._index.book_timestamps[:] = np.nan
+        self._lock = asyncio.Lock()
+
+        # Spawn keeps the shards free of the parent's threads and event loops
+        context = multiprocessing.get_context('spawn')
+        self._connections = []
+        self._processes = []
+        self._shard_opportunities = []
+        for ids in np.array_split(np.arange(len(self.compiled)), processes):
+            parent_connection, child_connection = context.Pipe()
+            offset = int(ids[0]) if len(ids) else 0
+            process = context.Process(
+                target=_shard_worker,
+                args=(child_connection, self._shm.name, self.compiled.subset(ids), depth, offset),
+                daemon=True
+            )
+            process.start()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+            self._shard_opportunities.append({})
+        self.opportunities = {}  # triangle id -> profitable trade record, merged from the shards
+
+    @property
+    def max_book_age(self):
+        return self._index.max_book_age
+
+    @max_book_age.setter
+    def max_book_age(self, max_book_age):
+        self._index.max_book_age = max_book_age
+
+    async def _broadcast(self, command, args=None):
+        """Send a command to every shard and merge their answers (caller holds the lock)."""
+        for connection in self._connections:
+            connection.send((command, (self.max_book_age, args)))
+        # Blocking reads, run in the executor so the event loop is free meanwhile
+        loop = asyncio.get_running_loop()
+        self._shard_opportunities = await asyncio.gather(
+            *(loop.run_in_executor(None, connection.recv) for connection in self._connections)
+        )
+        self.opportunities = {
+            triangle_id: trade for shard in self._shard_opportunities for triangle_id, trade in shard.items()
+        }
+
+    def update_book(self, symbol, order_book):
+        """
+        Write a book (and its timestamp) into shared memory.
+        Returns:
+            bool: True if the book of the symbol changed.
+        """
+        return self._index.update_book(symbol, order_book)
+
+    def load_order_books(self, order_book_dict):
+        """
+        Refresh every symbol from a {symbol: order_book} mapping, clearing missing books.
+        Returns:
+            list: Symbols whose book changed.
+        """
+        return [symbol for symbol in self.symbols if self.update_book(symbol, order_book_dict.get(symbol))]
+
+    async def apply_book_updates(self, order_book_dict):
+        """
+        Apply changed order books and have the shards re-price the triangles that contain them.
+        Returns:
+            np.ndarray: Ids of the re-priced triangles.
+        """
+        async with self._lock:
+            changed = [symbol for symbol, order_book in order_book_dict.items() if self.update_book(symbol, order_book)]
+            if changed:
+                await self._broadcast('reprice', changed)
+            return self._index.triangles_for_symbols(changed)
+
+    def ranked_opportunities(self, limit=None):
+        """Return the current profitable trades of all shards, best profit first."""
+        ranked = sorted(self.opportunities.values(), key=lambda trade: trade["profit"], reverse=True)
+        return ranked[:limit] if limit is not None else ranked
+
+    async def evaluate(self, fees, min_trade_volume_threshold, start_amount=1.0):
+        """
+        Re-price every triangle on all shards.
+        Returns:
+            list: Profitable trades, in triangle order.
+        """
+        async with self._lock:
+            await self._broadcast('evaluate', (fees, min_trade_volume_threshold, start_amount))
+        return [self.opportunities[i] for i in sorted(self.opportunities)]
+
+    def close(self):
+        """Stop the shards and free the shared memory."""
+        for connection in self._connections:
+            try:
+                connection.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._connections.clear()
+        self._processes.clear()
+        del self.book, self._index
+        self._shm.close()
+        self._shm.unlink()
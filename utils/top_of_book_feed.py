@@ -0,0 +1,217 @@
+import json
+import time
+import asyncio
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.exchange_pool import borrow_exchange, close_exchanges
+from utils.market_cache import load_markets
+from utils.order_book_manager import OrderBookManager
+
+# Columns of a published row
+BID, BID_SIZE, ASK, ASK_SIZE, TIMESTAMP = range(5)
+ROW_FIELDS = 5
+HEADER_FIELDS = 3  # magic, number of symbols, length of the symbol table
+MAGIC = 0x544F4231  # "TOB1"
+
+
+def row_order_book(symbol, row):
+    """
+    Returns:
+        dict: One-level ccxt-shaped order book of a published row, or None when it is empty.
+    """
+    if row is None or np.isnan(row[BID]) or np.isnan(row[ASK]):
+        return None
+    return {
+        'symbol': symbol,
+        'bids': [[float(row[BID]), float(row[BID_SIZE])]],
+        'asks': [[float(row[ASK]), float(row[ASK_SIZE])]],
+        'timestamp': int(row[TIMESTAMP] * 1000),
+        'nonce': None,
+    }
+
+
+class SharedTopOfBook:
+    """
+    Best bid/ask/size of every symbol in a `multiprocessing.shared_memory` block.
+
+    Layout: an int64 header, the JSON symbol table (padded to 8 bytes), one int64
+    sequence counter per symbol, then a float64 (n_symbols, 5) matrix of
+    [bid, bid size, ask, ask size, timestamp]. A single writer publishes a row with a
+    seqlock: the counter is odd while the row is written and even once it is complete,
+    so readers on the same host copy a consistent row without any lock and retry when
+    the counter moved underneath them.
+    """
+
+    def __init__(self, shm, symbols, owner):
+        self.shm = shm
+        self.name = shm.name
+        self.symbols = symbols
+        self.symbol_index = {symbol: idx for idx, symbol in enumerate(symbols)}
+        self.owner = owner
+        table_size = self._table_size(symbols)
+        offset = HEADER_FIELDS * 8 + table_size
+        self.sequences = np.ndarray((len(symbols),), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += len(symbols) * 8
+        self.rows = np.ndarray((len(symbols), ROW_FIELDS), dtype=np.float64, buffer=shm.buf, offset=offset)
+
+    @staticmethod
+    def _table_size(symbols):
+        size = len(json.dumps(symbols).encode())
+        return size + (-size % 8)
+
+    @classmethod
+    def create(cls, symbols, name=None):
+        """Allocate the block for a list of symbols (done by the feed owner)."""
+        symbols = list(symbols)
+        table = json.dumps(symbols).encode()
+        table_size = cls._table_size(symbols)
+        size = HEADER_FIELDS * 8 + table_size + len(symbols) * 8 + len(symbols) * ROW_FIELDS * 8
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = (MAGIC, len(symbols), len(table))
+        shm.buf[HEADER_FIELDS * 8:HEADER_FIELDS * 8 + len(table)] = table
+        del header
+        top_of_book = cls(shm, symbols, owner=True)
+        top_of_book.sequences[:] = 0
+        top_of_book.rows[:] = np.nan
+        return top_of_book
+
+    @classmethod
+    def attach(cls, name):
+        """Map an existing block by name, reading the symbol table from it."""
+        shm = shared_memory.SharedMemory(name=name)
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        magic, n_symbols, table_length = (int(value) for value in header)
+        del header
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError(f"Shared memory block {name} is not a top-of-book matrix")
+        symbols = json.loads(bytes(shm.buf[HEADER_FIELDS * 8:HEADER_FIELDS * 8 + table_length]))
+        if len(symbols) != n_symbols:
+            shm.close()
+            raise ValueError(f"Corrupted symbol table in {name}")
+        return cls(shm, symbols, owner=False)
+
+    def publish(self, symbol, bid, bid_size, ask, ask_size, timestamp=None):
+        """Write one symbol's best levels (single writer only)."""
+        idx = self.symbol_index.get(symbol)
+        if idx is None:
+            return
+        self.sequences[idx] += 1  # Odd: row being written
+        self.rows[idx] = (bid, bid_size, ask, ask_size, time.time() if timestamp is None else timestamp)
+        self.sequences[idx] += 1  # Even: row complete
+
+    def read(self, symbol, retries=100):
+        """
+        Returns:
+            np.ndarray: Consistent copy of [bid, bid size, ask, ask size, timestamp], or None.
+        """
+        idx = self.symbol_index.get(symbol)
+        if idx is None:
+            return None
+        for _ in range(retries):
+            before = self.sequences[idx]
+            if before % 2:
+                continue
+            row = self.rows[idx].copy()
+            if self.sequences[idx] == before:
+                return row
+        return None
+
+    def read_all(self, retries=100):
+        """
+        Returns:
+            np.ndarray: Consistent (n_symbols, 5) copy of the matrix, rows in `symbols` order,
+                or None when some rows kept changing during every retry.
+        """
+        before = self.sequences.copy()
+        rows = self.rows.copy()
+        for _ in range(retries):
+            after = self.sequences.copy()
+            torn = np.flatnonzero((before != after) | (before % 2 == 1))
+            if not len(torn):
+                return rows
+            before[torn] = after[torn]
+            rows[torn] = self.rows[torn]
+        return None
+
+    def order_book(self, symbol):
+        """
+        Returns:
+            dict: One-level ccxt-shaped order book of a symbol, or None when nothing was published.
+        """
+        return row_order_book(symbol, self.read(symbol))
+
+    def close(self):
+        """Unmap the block, and free it when this process created it."""
+        del self.sequences, self.rows
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+async def _feed(name, exchange_id, exchange_config, symbols, stop_event):
+    top_of_book = SharedTopOfBook.attach(name)
+    manager = None
+    try:
+        exchange = borrow_exchange(exchange_id, exchange_config)
+        await load_markets(exchange)
+
+        def publish(symbol):
+            best_bid, best_ask = manager.best_bid(symbol), manager.best_ask(symbol)
+            bid, bid_size = best_bid if best_bid else (np.nan, 0.0)
+            ask, ask_size = best_ask if best_ask else (np.nan, 0.0)
+            top_of_book.publish(symbol, bid, bid_size, ask, ask_size)
+
+        manager = OrderBookManager(exchange, depth=5, on_update=publish)
+        await manager.subscribe(symbols)
+        while not stop_event.is_set():
+            await asyncio.sleep(0.2)
+    except Exception as e:
+        logging.error(f"Top of book feed for {exchange_id} stopped: {e}")
+    finally:
+        if manager:
+            await manager.close()
+        await close_exchanges()
+        top_of_book.close()
+
+
+def _run_feed(name, exchange_id, exchange_config, symbols, stop_event):
+    asyncio.run(_feed(name, exchange_id, exchange_config, symbols, stop_event))
+
+
+class TopOfBookFeed:
+    """
+    Feed process keeping the books of some symbols live through a single exchange
+    connection and publishing their best levels into a `SharedTopOfBook`.
+    Consumers on the host call `SharedTopOfBook.attach(feed.name)`.
+    """
+
+    def __init__(self, exchange_id, exchange_config, symbols, name=None):
+        self.top_of_book = SharedTopOfBook.create(symbols, name)
+        self.name = self.top_of_book.name
+        context = multiprocessing.get_context('spawn')
+        self._stop_event = context.Event()
+        self._process = context.Process(
+            target=_run_feed,
+            args=(self.name, exchange_id, exchange_config, list(symbols), self._stop_event),
+            daemon=True
+        )
+
+    def start(self):
+        self._process.start()
+
+    def is_alive(self):
+        return self._process.is_alive()
+
+    def stop(self, timeout=10):
+        """Stop the feed process and free the shared block."""
+        self._stop_event.set()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self.top_of_book.close()
@@ -0,0 +1,125 @@
+import io
+import json
+import hashlib
+import logging
+import time
+
+import numpy as np
+
+from utils.utils import tradable_pairs
+from utils.database import get_database
+from utils.triangle_evaluator import CompiledTriangles, compile_triangles
+
+# Bump when the layout of CompiledTriangles changes so stale entries are rebuilt
+TRIANGLE_INDEX_VERSION = 1
+
+
+def snapshot_hash(available_pairs, eligible_coins, white_listed_coins):
+    """
+    Hash everything triangle discovery depends on: the listed symbols and both coin lists.
+    Returns:
+        str: Hex digest identifying the market snapshot.
+    """
+    snapshot = {
+        "version": TRIANGLE_INDEX_VERSION,
+        "pairs": sorted(available_pairs),
+        "eligible": sorted(eligible_coins),
+        "white_listed": sorted(white_listed_coins),
+    }
+    return hashlib.sha256(json.dumps(snapshot, separators=(',', ':')).encode()).hexdigest()
+
+
+_table_ready = False
+
+
+def _ensure_table(database):
+    global _table_ready
+    if _table_ready:
+        return
+    database.execute("""CREATE TABLE IF NOT EXISTS triangle_index(
+            exchange_id TEXT NOT NULL,
+            snapshot_hash TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            metadata TEXT NOT NULL,
+            compiled BLOB NOT NULL,
+            PRIMARY KEY (exchange_id, snapshot_hash)
+            );""")
+    _table_ready = True
+
+
+def load_compiled_triangles(exchange_id, snapshot):
+    """
+    Load the compiled triangles saved for an exchange and market snapshot.
+    Returns:
+        CompiledTriangles: The cached triangles, or None on a cache miss.
+    """
+    database = get_database()
+    _ensure_table(database)
+    row = database.fetchone(
+        "SELECT metadata, compiled FROM triangle_index WHERE exchange_id = ? AND snapshot_hash = ?",
+        (exchange_id, snapshot)
+    )
+    if row is None:
+        return None
+
+    metadata, blob = row
+    arrays = np.load(io.BytesIO(blob), allow_pickle=False)
+    metadata = json.loads(metadata)
+    return CompiledTriangles(
+        metadata["triangles"],
+        metadata["symbols"],
+        metadata["coins"],
+        arrays["legs"],
+        arrays["sides"],
+        arrays["triangle_ids"],
+        arrays["paths"]
+    )
+
+
+def save_compiled_triangles(exchange_id, snapshot, compiled):
+    """Save compiled triangles, replacing older snapshots of the same exchange."""
+    buffer = io.BytesIO()
+    np.savez(buffer, legs=compiled.legs, sides=compiled.sides, triangle_ids=compiled.triangle_ids, paths=compiled.paths)
+    metadata = json.dumps({
+        "triangles": compiled.triangular_pairs,
+        "symbols": compiled.symbols,
+        "coins": compiled.coins,
+    })
+    database = get_database()
+    _ensure_table(database)
+    with database.transaction() as connection:
+        connection.execute("DELETE FROM triangle_index WHERE exchange_id = ?", (exchange_id,))
+        connection.execute(
+            "INSERT INTO triangle_index (exchange_id, snapshot_hash, created_at, metadata, compiled) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (exchange_id, snapshot, int(time.time()), metadata, buffer.getvalue())
+        )
+
+
+def get_compiled_triangles(exchange_id, available_pairs, eligible_coins, white_listed_coins):
+    """
+    Return the compiled triangles for a market snapshot, running discovery only when
+    the listings, eligible coins or whitelist changed since the last run.
+    Args:
+        exchange_id (str): ccxt exchange id.
+        available_pairs (list): Symbols listed on the exchange.
+        eligible_coins (list): Coins a triangle may start from.
+        white_listed_coins (list): Coins allowed in a triangle.
+    Returns:
+        tuple: (CompiledTriangles, bool) where the flag is True on a warm start.
+    """
+    snapshot = snapshot_hash(available_pairs, eligible_coins or [], white_listed_coins or [])
+    try:
+        compiled = load_compiled_triangles(exchange_id, snapshot)
+    except Exception as e:
+        logging.error(f"Failed to load the triangle index for {exchange_id}: {e}")
+        compiled = None
+    if compiled is not None:
+        return compiled, True
+
+    compiled = compile_triangles(tradable_pairs(available_pairs, eligible_coins, white_listed_coins))
+    try:
+        save_compiled_triangles(exchange_id, snapshot, compiled)
+    except Exception as e:
+        logging.error(f"Failed to save the triangle index for {exchange_id}: {e}")
+    return compiled, False
@@ -0,0 +1,333 @@
+import time
+
+import numpy as np
+
+from utils.fill_simulator import BUY, SELL, simulate_fills, max_profitable_size
+from utils.order_book_store import DEFAULT_DEPTH, PRICE, AMOUNT, OrderBookStore
+
+PAIR_KEYS = ('pair_a', 'pair_b', 'pair_c')
+SIDE_NAMES = {BUY: 'buy', SELL: 'sell'}
+
+
+class CompiledTriangles:
+    """
+    Compact, direction-aware form of the `tradable_pairs` output.
+
+    Every triangle is compiled into its two cycles (start -> a_quote -> ... and the
+    reverse). Each cycle stores per leg the symbol index, the side (BUY at the ask or
+    SELL at the bid) and whether the price has to be inverted, so pricing never has to
+    parse symbol strings or branch on orientation.
+    """
+
+    def __init__(self, triangular_pairs, symbols, coins, legs, sides, triangle_ids, paths):
+        self.triangular_pairs = triangular_pairs
+        self.symbols = symbols  # symbol index -> symbol
+        self.coins = coins  # coin index -> coin
+        self.legs = legs  # (n, 3) symbol index of each leg
+        self.sides = sides  # (n, 3) BUY/SELL of each leg
+        self.invert = sides == BUY  # (n, 3) buying converts at 1 / ask
+        self.triangle_ids = triangle_ids  # (n,) source triangle of each cycle
+        self.paths = paths  # (n, 4) coin indexes visited, start coin first and last
+
+    def __len__(self):
+        return len(self.legs)
+
+    def subset(self, ids):
+        """Return the cycles with the given ids, sharing the symbol and coin tables."""
+        return CompiledTriangles(
+            self.triangular_pairs,
+            self.symbols,
+            self.coins,
+            self.legs[ids],
+            self.sides[ids],
+            self.triangle_ids[ids],
+            self.paths[ids]
+        )
+
+
+def _cycle_leg(pair, from_coin):
+    """Return (symbol, side, to_coin) for converting from_coin through a (symbol, base, quote) pair."""
+    symbol, base, quote = pair
+    if from_coin == base:
+        return symbol, SELL, quote
+    return symbol, BUY, base
+
+
+def compile_triangles(triangular_pairs):
+    """
+    Compile the triangles of `tradable_pairs` into their two directed cycles.
+    Args:
+        triangular_pairs (list): Triangles as returned by `tradable_pairs`.
+    Returns:
+        CompiledTriangles: Cycles starting from each triangle's `a_base` coin.
+    """
+    triangular_pairs = list(triangular_pairs)
+    symbols = sorted({triangle[pair] for triangle in triangular_pairs for pair in PAIR_KEYS})
+    symbol_index = {symbol: idx for idx, symbol in enumerate(symbols)}
+    coin_index = {}
+    legs, sides, triangle_ids, paths = [], [], [], []
+
+    for triangle_id, triangle in enumerate(triangular_pairs):
+        pair_a = (triangle['pair_a'], triangle['a_base'], triangle['a_quote'])
+        pair_b = (triangle['pair_b'], triangle['b_base'], triangle['b_quote'])
+        pair_c = (triangle['pair_c'], triangle['c_base'], triangle['c_quote'])
+        start, middle = triangle['a_base'], triangle['a_quote']
+        # Pair b or c links a_quote to the third coin, the other one links it back to the start coin
+        via_middle, via_start = (pair_b, pair_c) if middle in pair_b[1:] else (pair_c, pair_b)
+
+        for cycle in ((pair_a, via_middle, via_start), (via_start, via_middle, pair_a)):
+            coin, path, cycle_legs, cycle_sides = start, [start], [], []
+            for pair in cycle:
+                symbol, side, coin = _cycle_leg(pair, coin)
+                path.append(coin)
+                cycle_legs.append(symbol_index[symbol])
+                cycle_sides.append(side)
+            if coin != start:
+                break  # Not a closed triangle
+            legs.append(cycle_legs)
+            sides.append(cycle_sides)
+            triangle_ids.append(triangle_id)
+            paths.append([coin_index.setdefault(c, len(coin_index)) for c in path])
+
+    return CompiledTriangles(
+        triangular_pairs,
+        symbols,
+        list(coin_index),
+        np.array(legs, dtype=np.intp).reshape(-1, 3),
+        np.array(sides, dtype=np.int8).reshape(-1, 3),
+        np.array(triangle_ids, dtype=np.intp),
+        np.array(paths, dtype=np.intp).reshape(-1, 4)
+    )
+
+
+class TriangleEvaluator:
+    """
+    Batch evaluator for triangular arbitrage opportunities.
+
+    The triangles are compiled once into directed cycles (see `compile_triangles`) whose
+    legs are integer indexes into an `OrderBookStore` (one row per symbol), so every
+    cycle can be priced with a few NumPy operations instead of a Python loop.
+    Ids used below (triangle ids) are cycle ids: each triangle has one per direction.
+
+    A reverse index from symbol to the triangles that contain it lets a book update
+    re-price only the affected triangles and keep the ranked opportunity set current.
+
+    Triangles that are profitable at the top of book are then re-checked by walking
+    `start_amount` through the book depth of all three legs.
+
+    With `max_book_age` set, triangles with a leg whose book is older than that are
+    rejected instead of being priced from stale data.
+    """
+
+    def __init__(self, triangular_pairs, fees=0.001, min_trade_volume_threshold=0, start_amount=1.0,
+                 depth=DEFAULT_DEPTH, max_book_age=None, book=None):
+        """
+        Args:
+            triangular_pairs (list | CompiledTriangles): Triangles as returned by `tradable_pairs`,
+                or already compiled by `compile_triangles`.
+            fees (float): Taker fee applied on each leg.
+            min_trade_volume_threshold (float): Minimum level-0 volume required on every leg.
+            start_amount (float | dict): Trade size put through the triangle, in the starting coin,
+                or {coin: amount} per starting coin (see `set_start_amount`).
+            depth (int): Number of book levels kept per side for the fill simulation.
+            max_book_age (float): Maximum age of a leg's book (in seconds), None to accept any age.
+            book (OrderBookStore): Store holding the books of `symbols` in order (e.g. in shared
+                memory), a private one is created when None.
+        """
+        if not isinstance(triangular_pairs, CompiledTriangles):
+            triangular_pairs = compile_triangles(triangular_pairs)
+        self.compiled = triangular_pairs
+        self.triangular_pairs = self.compiled.triangular_pairs
+        self.fees = fees
+        self.min_trade_volume_threshold = min_trade_volume_threshold
+        self.max_book_age = max_book_age
+
+        self.symbols = self.compiled.symbols
+        self.symbol_index = {symbol: idx for idx, symbol in enumerate(self.symbols)}
+        self.legs = self.compiled.legs
+        self.sides = self.compiled.sides
+        self.book = book if book is not None else OrderBookStore(self.symbols, depth)
+        self.book_timestamps = np.full(len(self.symbols), np.nan)  # Epoch seconds of each symbol's book
+        self.stale_rejections = 0  # Triangles rejected only because a leg's book was too old
+
+        # Reverse index (CSR layout): triangles containing symbol s are
+        # symbol_triangles[symbol_offsets[s]:symbol_offsets[s + 1]]
+        flat_legs = self.legs.ravel()
+        self.symbol_triangles = (np.argsort(flat_legs, kind='stable') // 3).astype(np.intp)
+        self.symbol_offsets = np.zeros(len(self.symbols) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(flat_legs, minlength=len(self.symbols)), out=self.symbol_offsets[1:])
+
+        self.set_start_amount(start_amount)
+
+        self.profit = np.full(len(self.legs), np.nan)
+        self.is_opportunity = np.zeros(len(self.legs), dtype=bool)
+        self.opportunities = {}  # triangle id -> profitable trade record
+
+    def set_start_amount(self, start_amount):
+        """
+        Set the trade size of every cycle.
+        Args:
+            start_amount (float | dict): Amount of the starting coin, or {coin: amount} per
+                starting coin; cycles starting from a coin without an amount are not priced.
+        """
+        self.start_amount = start_amount
+        if isinstance(start_amount, dict):
+            amounts = np.array(
+                [np.nan if start_amount.get(coin) is None else float(start_amount[coin]) for coin in self.compiled.coins]
+            )
+            self.start_amounts = amounts[self.compiled.paths[:, 0]]  # (n,) trade size of each cycle
+        else:
+            self.start_amounts = np.full(len(self.legs), float(start_amount))
+
+    def update_book(self, symbol, order_book):
+        """
+        Copy the top levels of an order book into the book store.
+        Args:
+            symbol (str): The trading pair (e.g., 'BTC/USDT').
+            order_book (dict): ccxt order book, or None when it could not be fetched.
+        Returns:
+            bool: True if the book of the symbol changed.
+        """
+        idx = self.symbol_index.get(symbol)
+        if idx is None:
+            return False
+        # Exchange timestamp when given, otherwise the book is as fresh as its arrival
+        timestamp = order_book.get('timestamp') if order_book else None
+        was_stale = self.max_book_age is not None and not time.time() - self.book_timestamps[idx] <= self.max_book_age
+        self.book_timestamps[idx] = timestamp / 1000 if timestamp else (time.time() if order_book else np.nan)
+        # A stale book refreshed with the same levels still has to be re-priced
+        return self.book.update(symbol, order_book) or (was_stale and bool(order_book))
+
+    def load_order_books(self, order_book_dict):
+        """
+        Refresh every symbol from a {symbol: order_book} mapping, clearing missing books.
+        Returns:
+            list: Symbols whose book changed.
+        """
+        return [symbol for symbol in self.symbols if self.update_book(symbol, order_book_dict.get(symbol))]
+
+    def triangles_for_symbols(self, symbols):
+        """Return the sorted, unique ids of the triangles containing any of the given symbols."""
+        chunks = [
+            self.symbol_triangles[self.symbol_offsets[idx]:self.symbol_offsets[idx + 1]]
+            for idx in (self.symbol_index.get(symbol) for symbol in symbols) if idx is not None
+        ]
+        if not chunks:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(chunks))
+
+    def reprice(self, triangle_ids):
+        """
+        Price the given triangles at the top of book and update the opportunity set.
+        Triangles profitable at the top of book are confirmed by walking the trade size through the depth.
+        Args:
+            triangle_ids (np.ndarray): Ids of the triangles to re-price.
+        """
+        if not len(triangle_ids):
+            return
+        legs = self.legs[triangle_ids]
+        best_ask, best_bid = self.book.best_levels(legs)
+        min_volume = np.minimum(best_ask[..., AMOUNT], best_bid[..., AMOUNT])
+        prices = np.where(self.compiled.invert[triangle_ids], best_ask[..., PRICE], best_bid[..., PRICE])
+
+        start_amount = self.start_amounts[triangle_ids]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = np.where(self.compiled.invert[triangle_ids], 1 / prices, prices)
+            end_amount = start_amount * rates.prod(axis=1) * (1 - self.fees) ** 3
+            profit = end_amount - start_amount
+
+        valid = (min_volume >= self.min_trade_volume_threshold).all(axis=1) & (prices > 0).all(axis=1)
+        if self.max_book_age is not None:
+            fresh = (time.time() - self.book_timestamps[legs] <= self.max_book_age).all(axis=1)
+            self.stale_rejections += int((valid & ~fresh).sum())
+            valid &= fresh
+        profit[~valid] = np.nan
+
+        # Slippage only makes things worse, so only top-of-book winners need the depth walk
+        candidates = np.flatnonzero(profit > 0)
+        executable_end_amount = np.full(len(triangle_ids), np.nan)
+        max_size = np.zeros(len(triangle_ids))
+        if len(candidates):
+            candidate_ids = triangle_ids[candidates]
+            legs, sides = self.legs[candidate_ids], self.sides[candidate_ids]
+            filled_end, filled = simulate_fills(self.book, legs, sides, start_amount[candidates], self.fees)
+            executable_end_amount[candidates] = np.where(filled, filled_end, np.nan)
+            max_size[candidates] = max_profitable_size(self.book, legs, sides, self.fees)
+
+        with np.errstate(invalid='ignore'):
+            profit = executable_end_amount - start_amount
+            slippage = 1 - executable_end_amount / end_amount
+        self.profit[triangle_ids] = profit
+
+        profitable = profit > 0
+        for i in triangle_ids[~profitable & self.is_opportunity[triangle_ids]].tolist():
+            del self.opportunities[i]
+        self.is_opportunity[triangle_ids] = profitable
+
+        for k in np.flatnonzero(profitable).tolist():
+            self.opportunities[int(triangle_ids[k])] = self._trade_record(
+                int(triangle_ids[k]),
+                float(profit[k]),
+                {
+                    "start_amount": float(start_amount[k]),
+                    "end_amount": float(end_amount[k]),
+                    "executable_end_amount": float(executable_end_amount[k]),
+                    "slippage": float(slippage[k]),
+                    "max_profitable_size": float(max_size[k])
+                },
+                prices[k],
+                min_volume[k]
+            )
+
+    def _trade_record(self, triangle_id, profit, details, prices, min_volume):
+        """Build the profitable trade record of a triangle from its priced legs."""
+        details["legs"] = [
+            {
+                "symbol": self.symbols[self.legs[triangle_id, leg]],
+                "side": SIDE_NAMES[self.sides[triangle_id, leg]],
+                "price": float(prices[leg]),
+                "min_volume": float(min_volume[leg])
+            }
+            for leg in range(3)
+        ]
+        return {
+            "triangle": self.triangular_pairs[self.compiled.triangle_ids[triangle_id]],
+            "path": [self.compiled.coins[coin] for coin in self.compiled.paths[triangle_id]],
+            "profit": profit,
+            "details": details
+        }
+
+    def apply_book_updates(self, order_book_dict):
+        """
+        Apply changed order books and re-price only the triangles that contain them.
+        Args:
+            order_book_dict (dict): {symbol: order_book} of the books that were refreshed.
+        Returns:
+            np.ndarray: Ids of the re-priced triangles.
+        """
+        changed = [symbol for symbol, order_book in order_book_dict.items() if self.update_book(symbol, order_book)]
+        triangle_ids = self.triangles_for_symbols(changed)
+        self.reprice(triangle_ids)
+        return triangle_ids
+
+    def ranked_opportunities(self, limit=None):
+        """Return the current profitable trades, best profit first."""
+        ranked = sorted(self.opportunities.values(), key=lambda trade: trade["profit"], reverse=True)
+        return ranked[:limit] if limit is not None else ranked
+
+    def evaluate(self, fees, min_trade_volume_threshold, start_amount=1.0):
+        """
+        Re-price every triangle at once.
+        Args:
+            fees (float): Taker fee applied on each leg.
+            min_trade_volume_threshold (float): Minimum level-0 volume required on every leg.
+            start_amount (float | dict): Amount of the starting coin put through the triangle,
+                or {coin: amount} per starting coin.
+        Returns:
+            list: Profitable trades, in triangle order.
+        """
+        self.fees = fees
+        self.min_trade_volume_threshold = min_trade_volume_threshold
+        self.set_start_amount(start_amount)
+        self.reprice(np.arange(len(self.legs)))
+        return [self.opportunities[i] for i in sorted(self.opportunities)]